@@ -0,0 +1,42 @@
+"""Wall-clock time of optimize_prompt against a fake model with injected latency.
+
+Usage: python benchmarks/concurrency.py [--latency 0.2] [--workers 1 2 4 8 16]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_engineering_system.applications import SpecializedApplications
+from prompt_engineering_system.fake_model import FakeModel
+
+TEXT = (
+    "Large language models are sensitive to the wording of their instructions. "
+    "Small changes to a system prompt can noticeably change the quality of a summary, "
+    "which is why the system scores several candidate prompts and keeps the best one. "
+) * 5
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per fake model call")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--reasoning-type", default="standard")
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'workers':>8} {'calls':>6} {'seconds':>9} {'speedup':>8}  best score")
+    for workers in args.workers:
+        model = FakeModel(latency=args.latency)
+        apps = SpecializedApplications(model=model, max_workers=workers, request_timeout=None)
+        start = time.perf_counter()
+        result = apps.summarize_text(TEXT, reasoning_type=args.reasoning_type)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {model.calls:>6} {elapsed:>9.3f} {baseline / elapsed:>7.2f}x  {result['score']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Model calls and scoring time for data_extraction with the local extraction scorer.
+
+In each trial the fake model answers in grounded JSON for a random third of
+the system prompts and with prose for the rest. A fully grounded extraction
+ends the search, so calls are averaged over trials.
+
+Usage: python benchmarks/extraction.py [--document-words 20000] [--workers 1 4] [--strategy exhaustive threshold] [--trials 20]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_engineering_system.applications import SpecializedApplications
+from prompt_engineering_system.evaluator import PromptEvaluator
+from prompt_engineering_system.fake_model import FakeModel
+from prompt_engineering_system.search import get_strategy
+
+FIELDS = ["invoice number", "customer", "amount"]
+
+
+def document(words: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    filler = " ".join(rng.choice(["the", "order", "shipment", "terms", "account", "period", "balance"]) for _ in range(words))
+    return f"{filler} Invoice number INV-2291 was issued to Northwind Traders for 4,310 dollars. {filler}"
+
+
+GROUNDED = '{"invoice number": "INV-2291", "customer": "Northwind Traders", "amount": "4,310 dollars"}'
+
+
+def make_responder(trial: int):
+    def responder(prompt: str) -> str:
+        system_prompt = prompt.split("\n", 1)[0]
+        if random.Random(f"{trial}:{system_prompt}").random() < 1 / 3:
+            return GROUNDED
+        return "The document appears to describe an invoice for a customer."
+    return responder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--document-words", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--strategy", nargs="+", default=["exhaustive", "threshold"])
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--trials", type=int, default=20)
+    args = parser.parse_args()
+    text = document(args.document_words // 2)
+
+    print(f"{'strategy':<12} {'workers':>7} {'candidates':>10} {'mean calls':>10} {'mean seconds':>12}")
+    for name in args.strategy:
+        for workers in args.workers:
+            calls = elapsed = 0.0
+            for trial in range(args.trials):
+                model = FakeModel(latency=args.latency, responder=make_responder(trial))
+                apps = SpecializedApplications(model=model, max_workers=workers, request_timeout=None,
+                                               search_strategy=get_strategy(name))
+                start = time.perf_counter()
+                calls += apps.extract_data(text, FIELDS, "standard")["calls"]
+                elapsed += time.perf_counter() - start
+            candidates = len(apps.prompt_generator.generate_system_prompts("data_extraction"))
+            print(f"{name:<12} {workers:>7} {candidates:>10} {calls / args.trials:>10.1f} {elapsed / args.trials:>12.3f}")
+
+    evaluator = PromptEvaluator()
+    output = GROUNDED
+    evaluator.score_extraction(text, output, FIELDS)
+    evaluator.score_batch(text, [output], rouge_types=("rougeL",))
+    for label, score in (("extraction", lambda: evaluator.score_extraction(text, output, FIELDS)),
+                         ("ROUGE-L", lambda: evaluator.score_batch(text, [output], rouge_types=("rougeL",)))):
+        start = time.perf_counter()
+        for _ in range(50):
+            score()
+        print(f"{label} scoring: {(time.perf_counter() - start) / 50 * 1000:.3f} ms per candidate")
+
+
+if __name__ == "__main__":
+    main()
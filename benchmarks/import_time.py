@@ -0,0 +1,59 @@
+"""Cold import time and peak RSS of the package's entry points.
+
+Each target is imported in a fresh interpreter so nothing is shared between
+measurements. Usage: python benchmarks/import_time.py [--repeat 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = [
+    ("package", "import prompt_engineering_system"),
+    ("PromptEngineeringSystem", "from prompt_engineering_system import PromptEngineeringSystem"),
+    ("batch runner", "import prompt_engineering_system.batch"),
+    ("first scoring call", "from prompt_engineering_system.evaluator import PromptEvaluator; "
+                           "PromptEvaluator().score_batch('a b c', ['a b'])"),
+]
+
+HEAVY = ["streamlit", "google.generativeai", "torch", "transformers", "pandas",
+         "rouge_score", "sacrebleu", "numpy", "qdrant_client", "sentence_transformers"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss = rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+except ImportError:
+    rss = float("nan")
+print(json.dumps({{"seconds": elapsed, "rss_mb": rss, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(statement):
+    code = PROBE.format(statement=statement, heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per target; the fastest is reported")
+    args = parser.parse_args()
+
+    print(f"{'target':<26} {'seconds':>8} {'peak RSS MB':>12}  heavy modules loaded")
+    for name, statement in TARGETS:
+        runs = [measure(statement) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run["seconds"])
+        print(f"{name:<26} {best['seconds']:>8.3f} {best['rss_mb']:>12.1f}  {', '.join(best['loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
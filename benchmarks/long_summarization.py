@@ -0,0 +1,57 @@
+"""Latency versus document size: one prompt per candidate versus map-reduce summarization.
+
+The fake model's latency grows with prompt length, like a real model's prefill.
+
+Usage: python benchmarks/long_summarization.py [--sizes 20000 100000 400000] [--latency 0.05] [--prompt-latency 0.01] [--workers 8]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_engineering_system.applications import SpecializedApplications
+from prompt_engineering_system.fake_model import FakeModel
+
+
+def synthetic_document(chars: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(5000)]
+    words = []
+    size = 0
+    while size < chars:
+        word = rng.choice(vocabulary)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20000, 100000, 400000], help="Document sizes in characters")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fixed seconds per fake call")
+    parser.add_argument("--prompt-latency", type=float, default=0.01, help="Extra seconds per 1000 prompt characters")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    modes = {
+        "single prompt": lambda apps, text: apps.summarize_text(text, "standard"),
+        "map-reduce + sample search": lambda apps, text: apps.summarize_long_text(text, "standard"),
+        "map-reduce, no search": lambda apps, text: apps.summarize_long_text(text, "standard", search_sample=False),
+    }
+    print(f"{'chars':>8}  {'mode':<28} {'seconds':>8} {'calls':>6} {'prompt tokens':>14}")
+    for size in args.sizes:
+        text = synthetic_document(size)
+        for name, run in modes.items():
+            model = FakeModel(latency=args.latency, prompt_latency=args.prompt_latency, output_words=80)
+            apps = SpecializedApplications(model=model, max_workers=args.workers, request_timeout=None)
+            start = time.perf_counter()
+            result = run(apps, text)
+            elapsed = time.perf_counter() - start
+            print(f"{size:>8}  {name:<28} {elapsed:>8.2f} {model.calls:>6} {result['usage']['prompt_tokens']:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Throughput of a mixed workload: one candidate pool per request versus a shared, deduplicating scheduler.
+
+Each document gets a summary, an extraction and two questions, and every
+request is submitted twice, as happens when several users work on the same
+file. Both runs have the same total number of model calls in flight.
+
+Usage: python benchmarks/scheduler.py [--documents 6] [--latency 0.1] [--requests-in-flight 4] [--candidate-workers 4]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_engineering_system.fake_model import FakeModel
+from prompt_engineering_system.main import PromptEngineeringSystem
+
+
+def workload(documents: int):
+    requests = []
+    for i in range(documents):
+        text = (
+            f"Invoice {1000 + i} was issued to Customer {i} on 2024-0{1 + i % 9}-15 for {250 + 17 * i} dollars. "
+            f"Payment is due within {30 + i} days and late fees of {i % 5 + 1} percent apply. "
+        ) * 15
+        requests += [
+            {"task_type": "summarization", "text": text},
+            {"task_type": "data_extraction", "text": text, "fields": ["invoice", "customer", "amount"]},
+            {"task_type": "question_answering", "context": text, "question": "When is payment due?", "priority": 1},
+            {"task_type": "question_answering", "context": text, "question": "Who is the customer?"},
+        ]
+    return requests * 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per fake model call")
+    parser.add_argument("--requests-in-flight", type=int, default=4)
+    parser.add_argument("--candidate-workers", type=int, default=4)
+    args = parser.parse_args()
+    requests = workload(args.documents)
+    pool_size = args.requests_in_flight * args.candidate_workers
+
+    def run_one(system, request):
+        request = dict(request)
+        request.pop("priority", None)
+        return system.run_application(request.pop("task_type"), **request)
+
+    model = FakeModel(latency=args.latency)
+    system = PromptEngineeringSystem(model=model, max_workers=args.candidate_workers, request_timeout=None)
+    system.run_application("summarization", text="warm up the scorer")
+    model.calls = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.requests_in_flight) as pool:
+        list(pool.map(lambda request: run_one(system, request), requests))
+    separate = time.perf_counter() - start
+    separate_calls = model.calls
+
+    model.calls = 0
+    start = time.perf_counter()
+    first = None
+    for _, _, error in system.run_many(requests, max_workers=pool_size):
+        if error is not None:
+            raise error
+        first = first if first is not None else time.perf_counter() - start
+    shared = time.perf_counter() - start
+
+    print(f"{len(requests)} requests, {pool_size} model calls in flight")
+    print(f"{'mode':<22} {'seconds':>8} {'requests/s':>11} {'model calls':>12}")
+    print(f"{'per-request pools':<22} {separate:>8.2f} {len(requests) / separate:>11.2f} {separate_calls:>12}")
+    print(f"{'shared scheduler':<22} {shared:>8.2f} {len(requests) / shared:>11.2f} {model.calls:>12}")
+    print(f"first shared result after {first:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
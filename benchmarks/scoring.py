@@ -0,0 +1,67 @@
+"""Per-pair ROUGE scoring versus PromptEvaluator.score_batch, and summary cost.
+
+Usage: python benchmarks/scoring.py [--candidates 50] [--reference-words 2000] [--candidate-words 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_engineering_system.evaluator import PromptEvaluator
+
+VOCABULARY = (
+    "prompt model summary answer context question extract field value document page chunk score "
+    "candidate reasoning system language output token latency budget running evaluated generated"
+).split()
+
+
+def words(rng, count):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(count))
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=50)
+    parser.add_argument("--reference-words", type=int, default=2000)
+    parser.add_argument("--candidate-words", type=int, default=200)
+    parser.add_argument("--history", type=int, default=100000, help="Entries in the metrics history")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    reference = words(rng, args.reference_words)
+    candidates = [words(rng, args.candidate_words) for _ in range(args.candidates)]
+    evaluator = PromptEvaluator()
+
+    per_pair, expected = timed(lambda: [evaluator.rouge.score(reference, c)["rougeL"].fmeasure for c in candidates], args.repeat)
+    batch, actual = timed(lambda: [s["rougeL"] for s in evaluator.score_batch(reference, candidates, rouge_types=("rougeL",))], args.repeat)
+    assert all(abs(a - b) < 1e-9 for a, b in zip(expected, actual)), "batch scores differ from rouge_score"
+    print(f"ROUGE-L, {args.candidates} candidates x {args.candidate_words} words vs {args.reference_words}-word reference")
+    print(f"  per-pair rouge_score: {per_pair * 1000:9.1f} ms")
+    print(f"  score_batch:          {batch * 1000:9.1f} ms  ({per_pair / batch:.1f}x)")
+
+    for i in range(args.history):
+        evaluator.metrics_history.append({"rouge1": i % 7 / 7, "rougeL": i % 5 / 5, "response_time": 0.1})
+    summary, _ = timed(evaluator.get_metrics_summary, args.repeat)
+    print(f"get_metrics_summary over {args.history} entries: {summary * 1e6:.1f} us")
+    try:
+        import pandas as pd
+    except ImportError:
+        return
+    rows = list(evaluator.metrics_history)
+    rebuild, _ = timed(lambda: pd.DataFrame(rows).mean().to_dict(), args.repeat)
+    print(f"  DataFrame rebuild (previous approach): {rebuild * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Offline comparison of prompt search strategies by replaying recorded outputs.
+
+Record every candidate once (costs one model call per candidate):
+    python benchmarks/search_strategies.py record inputs.jsonl recordings.jsonl [--fake]
+
+Replay the recordings through each strategy (no model calls):
+    python benchmarks/search_strategies.py replay recordings.jsonl
+
+``inputs.jsonl`` holds one ``{"task_type": ..., "reasoning_type": ..., ...}``
+object per line with the keyword arguments of the matching application
+method. Without a recordings file, ``replay`` uses seeded synthetic scores.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_engineering_system.search import BudgetSearch, ExhaustiveSearch, SuccessiveHalving, ThresholdSearch
+
+STRATEGIES = [
+    ExhaustiveSearch(),
+    ThresholdSearch(threshold=0.4, batch_size=4),
+    BudgetSearch(max_calls=5),
+    BudgetSearch(max_calls=10),
+    SuccessiveHalving(eta=2),
+    SuccessiveHalving(eta=3),
+]
+
+INPUT_FIELDS = {
+    "summarization": ("text",),
+    "code_generation": ("task_description", "language"),
+    "data_extraction": ("text", "fields"),
+    "question_answering": ("context", "question"),
+}
+
+
+def record(args):
+    from prompt_engineering_system.applications import SpecializedApplications, get_pipelines
+    from prompt_engineering_system.fake_model import FakeModel
+
+    model = FakeModel() if args.fake else get_pipelines()[0]
+    apps = SpecializedApplications(model=model)
+    with open(args.inputs, encoding="utf-8") as src, open(args.recordings, "w", encoding="utf-8") as dst:
+        for line in src:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            task_type = item["task_type"]
+            kwargs = {field: item[field] for field in INPUT_FIELDS[task_type]}
+            if task_type == "data_extraction":
+                kwargs["fields"] = ", ".join(kwargs["fields"])
+            reference = str(kwargs.get("text", kwargs.get("task_description", "")))
+            groups = apps.prompt_generator.generate_system_prompt_groups(
+                task_type, kwargs.get("language"), item.get("reasoning_type", "standard"))
+            candidates = []
+            for group_id, group in enumerate(groups):
+                for system_prompt in group:
+                    prompt = apps.prompt_generator.generate_prompt(task_type, system_prompt, **kwargs)
+                    output, _, _ = apps._generate(model, prompt)
+                    if task_type == "data_extraction":
+                        # Scored the way optimize_prompt scores extractions; invalid ones score 0.
+                        score = apps.evaluator.score_extraction(reference, output, item["fields"])["score"]
+                    else:
+                        score = apps.evaluator.rouge.score(reference, output)['rougeL'].fmeasure
+                    candidates.append({"group": group_id, "system_prompt": system_prompt, "output": output, "score": score})
+            dst.write(json.dumps({"task_type": task_type, "candidates": candidates}) + "\n")
+
+
+def load_recordings(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def synthetic_recordings(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        candidates = []
+        for group_id in range(10):
+            base = rng.uniform(0.1, 0.5)
+            for _ in range(5):
+                candidates.append({"group": group_id, "score": max(0.0, base + rng.gauss(0, 0.05))})
+        yield {"task_type": "synthetic", "candidates": candidates}
+
+
+def replay(args):
+    recordings = list(load_recordings(args.recordings) if args.recordings else synthetic_recordings(args.synthetic))
+    print(f"{'strategy':<40} {'calls':>7} {'saved':>7} {'score lost':>11} {'optimal':>8}")
+    for strategy in STRATEGIES:
+        total_calls = total_possible = 0
+        lost = optimal = 0.0
+        for item in recordings:
+            scores = [c["score"] for c in item["candidates"]]
+            groups = {}
+            for index, candidate in enumerate(item["candidates"]):
+                groups.setdefault(candidate["group"], []).append(index)
+            seen = {}
+
+            def evaluate(indices):
+                result = {i: scores[i] for i in indices}
+                seen.update(result)
+                return result
+
+            strategy.run(list(groups.values()), evaluate)
+            found = max(seen.values(), default=0.0)
+            total_calls += len(seen)
+            total_possible += len(scores)
+            lost += max(scores) - found
+            optimal += found >= max(scores)
+        n = len(recordings)
+        params = ", ".join(f"{k}={v}" for k, v in vars(strategy).items() if v is not None)
+        label = f"{strategy.name}({params})"
+        print(f"{label:<40} {total_calls / n:>7.1f} {1 - total_calls / total_possible:>6.0%} "
+              f"{lost / n:>11.4f} {optimal / n:>7.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    rec = commands.add_parser("record", help="Call the model for every candidate and store the outputs")
+    rec.add_argument("inputs")
+    rec.add_argument("recordings")
+    rec.add_argument("--fake", action="store_true", help="Use the offline FakeModel instead of Gemini")
+    rep = commands.add_parser("replay", help="Replay recordings through every search strategy")
+    rep.add_argument("recordings", nargs="?")
+    rep.add_argument("--synthetic", type=int, default=200, help="Synthetic cases when no recordings are given")
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args)
+    else:
+        replay(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Time to first token with streaming versus time to the blocking result.
+
+Usage: python benchmarks/streaming.py [--latency 0.3] [--token-latency 0.02] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_engineering_system.applications import SpecializedApplications
+from prompt_engineering_system.fake_model import FakeModel
+
+TEXT = (
+    "Streaming lets the interface show partial output while the remaining candidates are still "
+    "being generated, so users see progress long before the best prompt has been chosen. "
+) * 5
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds before a fake call's first token")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="Seconds between fake tokens")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--reasoning-type", default="standard")
+    args = parser.parse_args()
+
+    def apps():
+        model = FakeModel(latency=args.latency, token_latency=args.token_latency)
+        return SpecializedApplications(model=model, max_workers=args.workers, request_timeout=None)
+
+    start = time.perf_counter()
+    blocking = apps().summarize_text(TEXT, reasoning_type=args.reasoning_type)
+    blocking_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first_token = first_leader = None
+    tokens = 0
+    for event in apps().summarize_text(TEXT, reasoning_type=args.reasoning_type, stream=True):
+        now = time.perf_counter() - start
+        if event["event"] == "token":
+            tokens += 1
+            first_token = first_token if first_token is not None else now
+        elif event["event"] == "leader_changed" and first_leader is None:
+            first_leader = now
+        elif event["event"] == "done":
+            streamed = event["result"]
+    total = time.perf_counter() - start
+
+    print(f"blocking result:     {blocking_time:7.3f}s  (score {blocking['score']:.4f})")
+    print(f"stream first token:  {first_token:7.3f}s")
+    print(f"stream first leader: {first_leader:7.3f}s")
+    print(f"stream done:         {total:7.3f}s  (score {streamed['score']:.4f}, {tokens} token events)")
+
+
+if __name__ == "__main__":
+    main()
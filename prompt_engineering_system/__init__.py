@@ -1,7 +1,4 @@
-from .prompt_generator import PromptGenerator
-from .evaluator import PromptEvaluator
-from .applications import SpecializedApplications
-from .main import PromptEngineeringSystem
+import importlib
 
 __version__ = "0.1.0"
 __all__ = [
@@ -9,4 +6,25 @@ __all__ = [
     "PromptEvaluator",
     "SpecializedApplications",
     "PromptEngineeringSystem"
-] 
\ No newline at end of file
+]
+
+# Submodules are imported on first attribute access so that importing the
+# package (e.g. for the batch runner) does not load every backend up front.
+_EXPORTS = {
+    "PromptGenerator": ".prompt_generator",
+    "PromptEvaluator": ".evaluator",
+    "SpecializedApplications": ".applications",
+    "PromptEngineeringSystem": ".main",
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS))
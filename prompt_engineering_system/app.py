@@ -1,8 +1,7 @@
-import os
 import streamlit as st
 from prompt_engineering_system.main import PromptEngineeringSystem
-import tempfile
-import shutil
+from prompt_engineering_system.cache import ResponseCache
+from prompt_engineering_system.document_store import DocumentStore, content_hash
 import re
 
 # ===== Load Environment Variables =====
@@ -20,21 +19,31 @@ import re
 st.set_page_config(layout="wide")
 st.title("Advanced Prompt Engineering System")
 
-system = PromptEngineeringSystem()
+# The app is re-executed on every interaction, so the response cache must
+# outlive the PromptEngineeringSystem built below.
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache(max_entries=512, ttl=24 * 3600, disk_dir=".response_cache")
+
+@st.cache_resource
+def get_document_store():
+    return DocumentStore(".document_store")
+
+system = PromptEngineeringSystem(cache=get_response_cache(), document_store=get_document_store())
 
 # Initialize session state for PDF processing for RAG
 if 'processed_pdf' not in st.session_state:
     st.session_state.processed_pdf = False
-if 'pdf_path' not in st.session_state:
-    st.session_state.pdf_path = None
 if 'context_chunks' not in st.session_state:
     st.session_state.context_chunks = []
 if 'text' not in st.session_state:
     st.session_state.text = None
 if 'chunks' not in st.session_state:
     st.session_state.chunks = []
-if 'last_uploaded_filename' not in st.session_state:
-    st.session_state.last_uploaded_filename = None
+if 'document_hash' not in st.session_state:
+    st.session_state.document_hash = None
+if 'collection' not in st.session_state:
+    st.session_state.collection = None
 
 task = st.sidebar.selectbox("Select Task", [
     "summarization",
@@ -53,46 +62,40 @@ reasoning_type = st.sidebar.selectbox("Select Reasoning Type", [
 pdf_file = st.sidebar.file_uploader("Upload a PDF file (for Data Extraction/Q&A)", type=["pdf"])
 
 if pdf_file is not None:
-    if st.session_state.last_uploaded_filename != pdf_file.name:
+    pdf_bytes = pdf_file.getvalue()
+    document_hash = content_hash(pdf_bytes)
+    # Key on content rather than filename so renamed copies are not reprocessed.
+    if st.session_state.document_hash != document_hash:
         st.session_state.processed_pdf = False # Reset processing status for new file
-        st.session_state.pdf_path = None
         st.session_state.context_chunks = []
         st.session_state.text = None
         st.session_state.chunks = []
-        st.session_state.last_uploaded_filename = pdf_file.name
+        st.session_state.document_hash = document_hash
+        st.session_state.collection = None
 
     if not st.session_state.processed_pdf:
-        temp_dir = tempfile.mkdtemp()
-        temp_path = os.path.join(temp_dir, "uploaded.pdf")
         try:
-            with open(temp_path, "wb") as f:
-                f.write(pdf_file.read())
-            st.session_state.pdf_path = temp_path
             st.sidebar.info("⏳ Extracting and processing PDF...")
-            text = system.applications.extract_text_from_pdf(temp_path)
-            st.session_state.text = text
-            if text:
-                chunks = system.applications.chunk_text(text)
-                st.session_state.chunks = chunks
-                embeddings = system.applications.get_embeddings(chunks)
-                if system.applications._setup_rag_collection() and system.applications.upload_to_qdrant(chunks, embeddings):
-                    st.session_state.processed_pdf = True
-                    st.sidebar.success("✅ PDF processed and indexed.")
-                else:
-                    st.sidebar.error("Failed to process and index PDF.")
-            else:
+            indexed = system.index_document(pdf_bytes, pdf_file.name)
+            st.session_state.text = indexed["text"]
+            st.session_state.chunks = indexed["chunks"]
+            st.session_state.collection = indexed["collection"]
+            if not indexed["chunks"]:
                 st.sidebar.error("Failed to extract text from PDF.")
+            elif indexed["indexed"]:
+                st.session_state.processed_pdf = True
+                st.sidebar.success(f"✅ PDF processed and indexed ({indexed['embedded']} new chunks embedded, {indexed['reused']} reused).")
+            else:
+                st.sidebar.error("Failed to process and index PDF.")
         except Exception as e:
             st.sidebar.error(f"Error processing PDF: {str(e)}")
-            if st.session_state.pdf_path:
-                shutil.rmtree(os.path.dirname(st.session_state.pdf_path))
-                st.session_state.pdf_path = None
 
 # Main input area based on selected task
 input_data = {}
 if task == "summarization":
     st.header("Text Summarization")
     input_data["text"] = st.text_area("Text to Summarize")
+    input_data["long_document"] = st.checkbox("Long document mode", help="Summarize the text in chunks and merge the partial summaries")
 elif task == "code_generation":
     st.header("Code Generation")
     input_data["task_description"] = st.text_input("Describe the code task")
@@ -100,8 +103,10 @@ elif task == "code_generation":
 elif task == "data_extraction":
     st.header("Data Extraction")
     if st.session_state.processed_pdf:
-        st.info("Using text from uploaded PDF for data extraction.")
+        st.info("Using the most relevant passages of the uploaded PDF for data extraction.")
         input_data["text"] = st.session_state.text
+        input_data["use_retrieval"] = True
+        input_data["collection"] = st.session_state.collection
         st.text_area("Extracted Text (Read-only)", value=st.session_state.text, height=200, disabled=True)
     else:
         input_data["text"] = st.text_area("Text to Extract Data From")
@@ -110,8 +115,10 @@ elif task == "data_extraction":
 elif task == "question_answering":
     st.header("Question Answering")
     if st.session_state.processed_pdf:
-        st.info("Using text from uploaded PDF for context.")
+        st.info("Using the most relevant passages of the uploaded PDF as context.")
         input_data["context"] = st.session_state.text
+        input_data["use_retrieval"] = True
+        input_data["collection"] = st.session_state.collection
         st.text_area("Extracted Context (Read-only)", value=st.session_state.text, height=200, disabled=True)
     else:
         input_data["context"] = st.text_area("Context")
@@ -121,18 +128,54 @@ if st.button("Run Task"):
     if (task == "data_extraction" or task == "question_answering") and not (input_data.get("text") or input_data.get("context")) and not st.session_state.processed_pdf:
         st.error("Please upload a PDF or provide text input for Data Extraction/Question Answering.")
     else:
-        with st.spinner("Running..."):
-            result = system.run_application(task, **input_data, reasoning_type=reasoning_type)
-            st.subheader("System Prompt")
-            st.code(result.get("system_prompt", "N/A"))
-            st.subheader("Full Prompt")
-            st.code(result.get("prompt", "N/A"))
-            st.subheader("Output")
-            st.markdown(result.get("output", "N/A"))
-            st.subheader("Prompt Score (ROUGE-L)")
-            st.write(result.get("score", "N/A"))
-
-# Cleanup when the app is closed
-if st.session_state.pdf_path and os.path.exists(st.session_state.pdf_path):
-    shutil.rmtree(os.path.dirname(st.session_state.pdf_path))
-    st.session_state.pdf_path = None
\ No newline at end of file
+        # Render progress live: the current leader's output (or the first candidate
+        # to produce tokens) streams into the output box as it arrives.
+        status = st.empty()
+        live_output = st.empty()
+        outputs = {}
+        scored = 0
+        rejected = None
+        shown = None
+        leader = None
+        result = {}
+        for event in system.run_application(task, **input_data, reasoning_type=reasoning_type, stream=True):
+            kind = event["event"]
+            if kind == "token":
+                outputs[event["index"]] = outputs.get(event["index"], "") + event["text"]
+                if shown is None:
+                    shown = event["index"]
+            elif kind == "candidate_scored":
+                scored += 1
+            elif kind == "candidate_rejected":
+                rejected = event
+            elif kind == "chunk_summarized":
+                status.info(f"⏳ Level {event['level']}: summarized part {event['index'] + 1} of {event['total']}")
+                continue
+            elif kind == "leader_changed":
+                leader = event
+                shown = event["index"]
+            elif kind == "error":
+                st.error(event["message"])
+            elif kind == "warning":
+                st.warning(event["message"])
+            elif kind == "done":
+                result = event["result"]
+                break
+            leading = f", leader scores {leader['score']:.3f}" if leader else ""
+            rejection = f" — candidate {rejected['index'] + 1} rejected: {rejected['reason']}" if rejected else ""
+            status.info(f"⏳ {scored} candidates scored{leading}{rejection}")
+            if shown is not None and kind in ("token", "leader_changed"):
+                live_output.markdown(outputs.get(shown, ""))
+        status.empty()
+        live_output.empty()
+        st.subheader("System Prompt")
+        st.code(result.get("system_prompt", "N/A"))
+        st.subheader("Full Prompt")
+        st.code(result.get("prompt", "N/A"))
+        st.subheader("Output")
+        st.markdown(result.get("output", "N/A"))
+        if result.get("extracted"):
+            st.subheader("Extracted Fields")
+            st.json(result["extracted"])
+        st.subheader("Prompt Score (fields found in the text)" if task == "data_extraction" else "Prompt Score (ROUGE-L)")
+        st.write(result.get("score", "N/A"))
\ No newline at end of file
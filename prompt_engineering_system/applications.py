@@ -1,133 +1,599 @@
-from transformers import pipeline
 from .prompt_generator import PromptGenerator
 from .evaluator import PromptEvaluator
-import torch
+from .executor import CandidateExecutor, active_flow
+from .search import ExhaustiveSearch, SearchStrategy, interleave, limit_groups
+from .memory import PromptMemory
+from .cache import ResponseCache, model_cache_key
+from .budget import PromptBudget, CONTEXT_FIELDS, compress_whitespace, estimate_cost, estimate_tokens
+from .notifications import notify
+from .tracing import span
+from .backends import get_backend
+from . import rag
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Iterator, Optional
+import io
 import os
-import streamlit as st
+import contextvars
+import queue
+import threading
+import time
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+if TYPE_CHECKING:
+    from .document_store import DocumentStore
 
 # Load environment variables from .env
 load_dotenv()
 
-os.environ["HF_HOME"] = "C:/Users/Shravya H Jain/huggingface_cache"
-
-@st.cache_resource
+# Cached for the life of the process, so every SpecializedApplications shares one client.
+@lru_cache(maxsize=None)
 def get_pipelines():
     gemini_api_key = os.getenv("GEMINI_API_KEY")
     if not gemini_api_key:
-        st.error("GEMINI_API_KEY not found in environment variables.")
+        notify("error", "GEMINI_API_KEY not found in environment variables.")
         return None, None
 
-    genai.configure(api_key=gemini_api_key)
-    
     # Use the gemini-1.5-flash model as requested
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        st.success("Successfully initialized gemini-1.5-flash model.")
+        model = get_backend("gemini", model_name="gemini-1.5-flash")
+        model.backend.model # create the SDK client now so failures surface here
+        notify("success", "Successfully initialized gemini-1.5-flash model.")
     except Exception as e:
-        st.error(f"Error initializing gemini-1.5-flash model: {e}")
+        notify("error", f"Error initializing gemini-1.5-flash model: {e}")
         model = None
 
     return model, model
 
+# "first" puts historical winners ahead of the other candidates, "only" scores
+# nothing but the winners and falls back to a full search when there are none.
+WARM_START_MODES = ("off", "first", "only")
+
+_SEARCH_DONE = object()
+
+# Long documents are summarized chunk by chunk, then the partial summaries are
+# merged SUMMARY_FAN_IN at a time until a single summary is left.
+SUMMARY_CHUNK_SIZE = 4000
+SUMMARY_CHUNK_OVERLAP = 200
+SUMMARY_FAN_IN = 5
+
 class SpecializedApplications:
-    def __init__(self):
-        self.device = -1
-        self.code_model = "Salesforce/codegen-350M-mono"
-        self.gemini_model, _ = get_pipelines()
+    def __init__(self, model=None, max_workers: int = 4, request_timeout: Optional[float] = 60.0,
+                 search_strategy: Optional[SearchStrategy] = None, memory: Optional[PromptMemory] = None,
+                 warm_start: str = "off", warm_top_k: int = 1, cache: Optional[ResponseCache] = None,
+                 document_store: Optional["DocumentStore"] = None, backend: Optional[str] = None,
+                 budget: Optional[PromptBudget] = None):
+        if warm_start not in WARM_START_MODES:
+            raise ValueError(f"Unknown warm_start mode: {warm_start}")
+        # An explicit model wins, then a named backend from the shared registry, then Gemini.
+        if model is not None:
+            self.gemini_model = model
+        elif backend is not None:
+            self.gemini_model = get_backend(backend)
+        else:
+            self.gemini_model = get_pipelines()[0]
+        self.executor = CandidateExecutor(max_workers=max_workers, timeout=request_timeout)
+        self.search_strategy = search_strategy or ExhaustiveSearch()
+        self.memory = memory
+        self.warm_start = warm_start
+        self.warm_top_k = warm_top_k
+        self.cache = cache
+        self.document_store = document_store
+        self.budget = budget
         self.prompt_generator = PromptGenerator()
         self.evaluator = PromptEvaluator()
-        self._setup_templates()
-
-    def _setup_templates(self):
-        self.prompt_generator.add_template(
-            "summarization",
-            "{system_prompt}\nSummarize the following text:\n{text}\n"
-        )
-        self.prompt_generator.add_template(
-            "code_generation",
-            "{system_prompt}\nWrite a {language} function to {task_description}.\n# Solution:\ndef function_name():\n"
-        )
-        self.prompt_generator.add_template(
-            "data_extraction",
-            "{system_prompt}\nExtract the following fields from the text: {fields}\nText: {text}\n"
-        )
-        self.prompt_generator.add_template(
-            "question_answering",
-            "{system_prompt}\nContext: {context}\nQuestion: {question}\nAnswer:"
-        )
-
-    def optimize_prompt(self, task_type, template_name, input_kwargs, pipe, language=None, reasoning_type=None):
-        best_score = -float('inf')
-        best_result = None
+
+    def optimize_prompt(self, task_type, template_name, input_kwargs, pipe, language=None, reasoning_type=None, strategy: Optional[SearchStrategy] = None):
+        result = None
+        for event in self.iter_optimize_prompt(task_type, template_name, input_kwargs, language, reasoning_type, strategy):
+            if event["event"] == "error":
+                notify("error", event["message"])
+            elif event["event"] == "warning":
+                notify("warning", event["message"])
+            elif event["event"] == "done":
+                result = event["result"]
+        return result
+
+    def iter_optimize_prompt(self, task_type, template_name, input_kwargs, language=None, reasoning_type=None,
+                             strategy: Optional[SearchStrategy] = None, stream: bool = False,
+                             budget: Optional[PromptBudget] = None) -> Iterator[dict]:
+        """Run the prompt search, yielding progress events as they happen.
+
+        Events are dicts whose ``event`` key is one of ``candidate_started``,
+        ``token`` (only when ``stream`` is set), ``candidate_scored``,
+        ``candidate_rejected`` (an extraction that cannot be the answer, with
+        its ``reason``), ``candidate_failed``, ``leader_changed``, ``warning``,
+        ``error`` and finally ``done``, which carries the same ``result``
+        optimize_prompt returns. Nothing here calls streamlit; the consumer
+        renders events. ``budget`` replaces ``self.budget`` for this search.
+        """
         model_to_use = self.gemini_model
+        strategy = strategy or self.search_strategy
 
         if model_to_use is None:
-            return {"output": "Error: Gemini model not initialized.", "system_prompt": "", "prompt": "", "score": 0}
+            message = "Error: Gemini model not initialized."
+            yield {"event": "error", "message": message}
+            yield {"event": "done", "result": {"output": message, "system_prompt": "", "prompt": "", "score": 0}}
+            return
 
-        for system_prompt in self.prompt_generator.generate_system_prompts(task_type, language):
-            prompt = self.prompt_generator.generate_prompt(template_name, system_prompt, **input_kwargs)
-            
-            # Call Gemini API
-            try:
-                response = model_to_use.generate_content(prompt)
-                
-                # Extract output text
-                # The way to extract output might vary slightly based on the model and response structure
-                # For text-based models like gemini-pro, response.text is usually sufficient
-                if hasattr(response, 'text'):
-                    output = response.text
-                else:
-                    # Handle cases where response might not have a text attribute directly
-                    # This might require inspecting the response object structure
-                    output = str(response) # Fallback to string representation
-                    st.warning(f"Gemini response did not have a .text attribute for {task_type}. Using string representation.")
-                
-                # Note: For Tree of Thought, a more advanced implementation might involve
-                # multiple turns or specific output parsing to explore branches.
-                # This current implementation relies on the prompt modifier to guide a single response.
+        model_name = getattr(model_to_use, "model_name", "")
+        system_prompt_groups = self.prompt_generator.generate_system_prompt_groups(task_type, language, reasoning_type or "standard")
+        prompt_kwargs, truncated = input_kwargs, False
+        budget = budget or self.budget
+        if budget is not None:
+            prompt_kwargs, truncated = self._fit_budget(budget, template_name, system_prompt_groups, input_kwargs, model_name)
 
-            except Exception as e:
-                output = f"Error calling Gemini API: {e}"
-                st.error(output)
-                continue # Skip scoring if API call failed
-
-            # The evaluation part might need adjustment depending on Gemini's output format
-            reference = input_kwargs.get("text", input_kwargs.get("task_description", ""))
-            if output and isinstance(output, str):
-                 reference = str(reference)
-                 score = self.evaluator.rouge.score(reference, output)['rougeL'].fmeasure
+        candidates = []
+        groups = []
+        for system_prompt_group in system_prompt_groups:
+            group = []
+            for system_prompt in system_prompt_group:
+                prompt = self.prompt_generator.generate_prompt(template_name, system_prompt, **prompt_kwargs)
+                group.append(len(candidates))
+                candidates.append((system_prompt, prompt))
+            groups.append(group)
+
+        if self.memory is not None and self.warm_start != "off":
+            groups = self._warm_groups(groups, candidates, task_type, language, reasoning_type)
+
+        skipped = 0
+        if budget is not None:
+            order = interleave(groups)
+            limit = budget.max_candidates((estimate_tokens(candidates[i][1]) for i in order), model_name)
+            if limit is not None and limit < len(order):
+                skipped = len(order) - limit
+                groups = limit_groups(groups, limit)
+                yield {"event": "warning", "message": f"Request budget allows {limit} of {len(order)} candidates for {task_type}."}
+        if truncated:
+            yield {"event": "warning", "message": f"Input for {task_type} was truncated to fit the token budget."}
+
+        # The evaluation part might need adjustment depending on Gemini's output format
+        reference = str(input_kwargs.get("text", input_kwargs.get("task_description", "")))
+        # Extractions are scored by parsing them and checking the values against the text, not by ROUGE.
+        fields = None
+        if task_type == "data_extraction" and input_kwargs.get("fields"):
+            fields = [field.strip() for field in str(input_kwargs["fields"]).split(",") if field.strip()]
+
+        events = queue.Queue()
+        state = {"best_key": None, "best_result": None, "calls": 0, "failed": 0, "solved": False,
+                 "prompt_tokens": 0, "output_tokens": 0, "cost": 0.0}
+        calls_lock = threading.Lock()
+
+        def run_candidate(index):
+            system_prompt, prompt = candidates[index]
+            with calls_lock:
+                state["calls"] += 1
+            events.put({"event": "candidate_started", "index": index, "system_prompt": system_prompt})
+            on_token = (lambda text: events.put({"event": "token", "index": index, "text": text})) if stream else None
+            start = time.time()
+            generated = self._generate(model_to_use, prompt, on_token=on_token)
+            return generated, time.time() - start
+
+        def score_candidate(index, generated, error):
+            # Returns the candidate's score, or None when the call failed.
+            if error is not None:
+                # Skip scoring if API call failed
+                state["failed"] += 1
+                events.put({"event": "candidate_failed", "index": index, "error": str(error)})
+                events.put({"event": "error", "message": f"Error calling Gemini API: {error}"})
+                return None
+
+            (output, has_text, (prompt_tokens, output_tokens)), response_time = generated
+            cost = self._cost(model_name, prompt_tokens, output_tokens)
+            state["prompt_tokens"] += prompt_tokens
+            state["output_tokens"] += output_tokens
+            state["cost"] += cost
+            if not has_text:
+                events.put({"event": "warning", "message": f"Gemini response did not have a .text attribute for {task_type}. Using string representation."})
+            extraction = None
+            if output and isinstance(output, str) and fields:
+                extraction = self.evaluator.score_extraction(reference, output, fields)
+                score = extraction["score"]
+            elif output and isinstance(output, str):
+                # The evaluator keeps the tokenized reference, so scoring one at a time stays cheap.
+                score = self.evaluator.score_batch(reference, [output], rouge_types=("rougeL",))[0]["rougeL"]
             else:
-                 score = 0
-                 st.warning(f"Skipping evaluation for non-text output for {task_type}")
+                score = 0
+                events.put({"event": "warning", "message": f"Skipping evaluation for non-text output for {task_type}"})
+            self.evaluator.record({"extraction" if fields else "rougeL": score, "response_time": response_time,
+                                   "cost": cost, "prompt_tokens": prompt_tokens, "output_tokens": output_tokens})
+            events.put({"event": "candidate_scored", "index": index, "score": score})
+            if extraction is not None and not extraction["valid"]:
+                # Invalid extractions are never the answer, however the others score.
+                events.put({"event": "candidate_rejected", "index": index, "reason": extraction["reason"]})
+                return score
 
-            if score > best_score:
-                best_score = score
-                best_result = {
+            # Ties go to the earliest candidate, matching the sequential ordering.
+            key = (score, -index)
+            if state["best_key"] is None or key > state["best_key"]:
+                system_prompt, prompt = candidates[index]
+                state["best_key"] = key
+                state["best_result"] = {
                     "output": output,
                     "system_prompt": system_prompt,
                     "prompt": prompt,
                     "score": score
                 }
-        
+                if extraction is not None:
+                    state["best_result"]["extracted"] = extraction["fields"]
+                events.put({"event": "leader_changed", "index": index, "score": score, "system_prompt": system_prompt})
+            return score
+
+        def evaluate(indices):
+            scores = {}
+            if state["solved"]:
+                return scores
+            finished = set()
+            perfect = None
+            # Candidates run concurrently; the executor yields them in completion order.
+            results = self.executor.run(run_candidate, indices)
+            for position, generated, error in results:
+                index = indices[position]
+                finished.add(index)
+                score = score_candidate(index, generated, error)
+                if score is None:
+                    continue
+                scores[index] = score
+                if fields and score >= 1.0 and (perfect is None or index < perfect):
+                    perfect = index
+                # A fully grounded extraction cannot be beaten, only tied by an earlier candidate of this
+                # batch, so stop once those are done: the winner then does not depend on thread timing.
+                if perfect is not None and all(i in finished for i in indices if i < perfect):
+                    state["solved"] = True
+                    results.close()
+                    break
+            return scores
+
+        def drive():
+            try:
+                strategy.run(groups, evaluate)
+            except Exception as e:
+                events.put(e)
+            finally:
+                events.put(_SEARCH_DONE)
+
+        driver = threading.Thread(target=contextvars.copy_context().run, args=(drive,), name="prompt-search", daemon=True)
+        driver.start()
+        while True:
+            event = events.get()
+            if event is _SEARCH_DONE:
+                break
+            if isinstance(event, Exception):
+                raise event
+            yield event
+
+        best_result = state["best_result"]
         if best_result is None:
-             return {"output": "Could not generate output using Gemini.", "system_prompt": "", "prompt": "", "score": 0}
+            best_result = {"output": "Could not generate output using Gemini.", "system_prompt": "", "prompt": "", "score": 0}
+        elif self.memory is not None:
+            self.memory.record(task_type, language, reasoning_type, best_result["system_prompt"], best_result["score"])
+        best_result["calls"] = state["calls"]
+        best_result["failed"] = state["failed"]
+        best_result["usage"] = {"prompt_tokens": state["prompt_tokens"], "output_tokens": state["output_tokens"],
+                                "cost": state["cost"], "truncated": truncated, "skipped": skipped}
+        yield {"event": "done", "result": best_result}
+
+    def _cost(self, model_name, prompt_tokens, output_tokens):
+        if self.budget is not None:
+            return self.budget.cost(model_name, prompt_tokens, output_tokens)
+        return estimate_cost(model_name, prompt_tokens, output_tokens)
+
+    def _fit_budget(self, budget, template_name, system_prompt_groups, input_kwargs, model_name):
+        # Measure the longest prompt with the context left out, then size the context to the rest.
+        empty = {**input_kwargs, **{name: "" for name in CONTEXT_FIELDS if name in input_kwargs}}
+        overhead = max((estimate_tokens(self.prompt_generator.generate_prompt(template_name, system_prompt, **empty))
+                        for group in system_prompt_groups for system_prompt in group), default=0)
+        return budget.fit_context(input_kwargs, overhead, model_name)
+
+    def _warm_groups(self, groups, candidates, task_type, language, reasoning_type):
+        winners = self.memory.winners(task_type, language, reasoning_type, limit=self.warm_top_k)
+        positions = {system_prompt: index for index, (system_prompt, _) in enumerate(candidates)}
+        # Winners that are no longer in the catalog are ignored.
+        warm = [positions[w] for w in winners if w in positions]
+        if not warm:
+            return groups
+        if self.warm_start == "only":
+            return [[index] for index in warm]
+        rest = [[index for index in group if index not in warm] for group in groups]
+        return [[index] for index in warm] + [group for group in rest if group]
 
-        return best_result
+    def _generate(self, model, prompt, on_token: Optional[Callable[[str], None]] = None):
+        # Runs on an executor thread, so it must not touch streamlit directly.
+        key = None
+        if self.cache is not None:
+            key = model_cache_key(model, prompt)
+            with span("cache_lookup"):
+                cached = self.cache.get(key)
+            if cached is not None:
+                if on_token is not None:
+                    on_token(cached)
+                # Cache hits never reach the model, so they cost nothing.
+                return cached, True, (0, 0)
 
-    def summarize_text(self, text: str, reasoning_type: str):
+        if on_token is not None:
+            # Streamed responses arrive as chunks that each carry a piece of the text.
+            parts = []
+            chunk = None
+            with span("model_call", stream=True):
+                for chunk in model.generate_content(prompt, stream=True):
+                    text = getattr(chunk, 'text', '')
+                    if text:
+                        parts.append(text)
+                        on_token(text)
+            output = "".join(parts)
+            if key is not None:
+                self.cache.set(key, output)
+            # The last chunk carries the usage totals for the whole stream.
+            return output, True, self._usage(chunk, prompt, output)
+
+        flow = active_flow.get()
+        if flow is not None:
+            # Requests sharing a scheduler send each distinct prompt to the model once.
+            (output, has_text, usage), shared = flow.scheduler.deduplicate(
+                key or model_cache_key(model, prompt), lambda: self._call_model(model, prompt, key))
+            return output, has_text, (0, 0) if shared else usage
+        return self._call_model(model, prompt, key)
+
+    def _call_model(self, model, prompt, key):
+        with span("model_call", stream=False):
+            response = model.generate_content(prompt)
+
+        # Extract output text
+        # The way to extract output might vary slightly based on the model and response structure
+        # For text-based models like gemini-pro, response.text is usually sufficient
+        # Note: For Tree of Thought, a more advanced implementation might involve
+        # multiple turns or specific output parsing to explore branches.
+        # This current implementation relies on the prompt modifier to guide a single response.
+        if hasattr(response, 'text'):
+            if key is not None:
+                self.cache.set(key, response.text)
+            return response.text, True, self._usage(response, prompt, response.text)
+        # Fallback to string representation
+        return str(response), False, self._usage(response, prompt, str(response))
+
+    @staticmethod
+    def _usage(response, prompt, output):
+        # Gemini reports exact counts; other backends get an estimate.
+        metadata = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(metadata, "prompt_token_count", None)
+        output_tokens = getattr(metadata, "candidates_token_count", None)
+        if prompt_tokens is None:
+            prompt_tokens = estimate_tokens(prompt)
+        if output_tokens is None:
+            output_tokens = estimate_tokens(output)
+        return prompt_tokens, output_tokens
+
+    def _run(self, task_type, input_kwargs, language=None, reasoning_type=None, stream=False):
+        # With stream=True the caller gets the event iterator instead of the final result.
+        if stream:
+            return self.iter_optimize_prompt(task_type, task_type, input_kwargs, language, reasoning_type, stream=True)
+        return self.optimize_prompt(task_type, task_type, input_kwargs, self.gemini_model, language, reasoning_type=reasoning_type)
+
+    def summarize_text(self, text: str, reasoning_type: str, stream: bool = False, long_document: bool = False):
+        if long_document:
+            return self.summarize_long_text(text, reasoning_type, stream=stream)
         input_kwargs = {"text": text}
-        return self.optimize_prompt("summarization", "summarization", input_kwargs, self.gemini_model, reasoning_type=reasoning_type)
+        return self._run("summarization", input_kwargs, reasoning_type=reasoning_type, stream=stream)
+
+    def summarize_long_text(self, text: str, reasoning_type: str, chunk_size: int = SUMMARY_CHUNK_SIZE,
+                            fan_in: int = SUMMARY_FAN_IN, search_sample: bool = True, stream: bool = False):
+        events = self.iter_summarize_long_text(text, reasoning_type, chunk_size, fan_in, search_sample)
+        if stream:
+            return events
+        result = None
+        for event in events:
+            if event["event"] == "error":
+                notify("error", event["message"])
+            elif event["event"] == "warning":
+                notify("warning", event["message"])
+            elif event["event"] == "done":
+                result = event["result"]
+        return result
+
+    def iter_summarize_long_text(self, text: str, reasoning_type: str, chunk_size: int = SUMMARY_CHUNK_SIZE,
+                                 fan_in: int = SUMMARY_FAN_IN, search_sample: bool = True) -> Iterator[dict]:
+        """Map-reduce summarization for documents too long for one prompt.
+
+        With ``search_sample`` the system prompt search runs on one sample
+        chunk and its winner is used for every chunk; otherwise the first
+        catalog prompt is used. Chunks are summarized in parallel, then the
+        summaries are merged ``fan_in`` at a time, level by level. Besides the
+        sample search's events this yields ``chunk_summarized`` events and a
+        final ``done``. With a budget the chunk and merge calls are counted
+        first and the sample search gets the rest; a document whose calls do
+        not fit is summarized in one truncated prompt instead, with a warning.
+        """
+        if fan_in < 2:
+            raise ValueError("fan_in must be at least 2")
+        model = self.gemini_model
+        if self.budget is not None and self.budget.compress:
+            text = compress_whitespace(text)
+        chunks = rag.chunk_text(text, chunk_size, min(SUMMARY_CHUNK_OVERLAP, chunk_size // 5))
+        if model is None or len(chunks) <= 1:
+            yield from self.iter_optimize_prompt("summarization", "summarization", {"text": text}, reasoning_type=reasoning_type)
+            return
+
+        model_name = getattr(model, "model_name", "")
+        sample_budget = None
+        if self.budget is not None:
+            # The chunk and merge calls are the summary itself, so they are paid for first; the
+            # sample search gets what is left. A document that does not fit is summarized truncated.
+            planned = self._plan_long_summary(chunks, fan_in, reasoning_type)
+            tokens, cost = self.budget.planned_usage(planned, model_name)
+            if self.budget.exceeds(tokens, cost):
+                yield {"event": "warning", "message": f"Long-document summary needs about {len(planned)} calls and "
+                                                      f"{tokens} tokens, over the request budget; summarizing a truncated copy instead."}
+                yield from self.iter_optimize_prompt("summarization", "summarization", {"text": text}, reasoning_type=reasoning_type)
+                return
+            sample_budget = self.budget.remaining(tokens, cost)
+            if sample_budget is None and search_sample:
+                search_sample = False
+                yield {"event": "warning", "message": "Request budget leaves nothing for the sample prompt search; using the default prompt."}
+
+        usage = {"prompt_tokens": 0, "output_tokens": 0, "cost": 0.0, "truncated": False, "skipped": 0}
+        calls = failed = 0
+        system_prompt = ""
+        if search_sample:
+            # The middle chunk is more likely body text than a title page or references.
+            for event in self.iter_optimize_prompt("summarization", "summarization", {"text": chunks[len(chunks) // 2]},
+                                                   reasoning_type=reasoning_type, budget=sample_budget):
+                if event["event"] != "done":
+                    yield event
+                    continue
+                search = event["result"]
+                system_prompt = search["system_prompt"]
+                calls += search.get("calls", 0)
+                failed += search.get("failed", 0)
+                for key in ("prompt_tokens", "output_tokens", "cost", "skipped"):
+                    usage[key] += search.get("usage", {}).get(key, 0)
+        if not system_prompt:
+            system_prompt = self.prompt_generator.generate_system_prompts("summarization", reasoning_type=reasoning_type or "standard")[0]
+
+        def summarize(part):
+            prompt = self.prompt_generator.generate_prompt("summarization", system_prompt, text=part)
+            start = time.time()
+            return prompt, self._generate(model, prompt), time.time() - start
+
+        parts = chunks
+        level = 0
+        prompt = ""
+        while True:
+            level += 1
+            summaries = [None] * len(parts)
+            for position, generated, error in self.executor.run(summarize, parts):
+                calls += 1
+                if error is not None:
+                    failed += 1
+                    yield {"event": "error", "message": f"Error summarizing part {position + 1} of {len(parts)} at level {level}: {error}"}
+                    continue
+                prompt, (output, _, (prompt_tokens, output_tokens)), response_time = generated
+                cost = self._cost(model_name, prompt_tokens, output_tokens)
+                usage["prompt_tokens"] += prompt_tokens
+                usage["output_tokens"] += output_tokens
+                usage["cost"] += cost
+                self.evaluator.record({"response_time": response_time, "cost": cost,
+                                       "prompt_tokens": prompt_tokens, "output_tokens": output_tokens})
+                summaries[position] = output
+                yield {"event": "chunk_summarized", "level": level, "index": position, "total": len(parts)}
+            summaries = [summary for summary in summaries if summary]
+            if len(parts) == 1 or len(summaries) <= 1:
+                break
+            parts = ["\n\n".join(summaries[i:i + fan_in]) for i in range(0, len(summaries), fan_in)]
 
-    def generate_code(self, task_description: str, language: str, reasoning_type: str):
+        if summaries:
+            output = summaries[0]
+            score = self.evaluator.score_batch(text, [output], rouge_types=("rougeL",))[0]["rougeL"]
+        else:
+            output, prompt, score = "Could not generate output using Gemini.", "", 0
+        yield {"event": "done", "result": {
+            "output": output,
+            "system_prompt": system_prompt,
+            "prompt": prompt,
+            "score": score,
+            "calls": calls,
+            "failed": failed,
+            "chunks": len(chunks),
+            "levels": level,
+            "usage": usage,
+        }}
+
+    def _plan_long_summary(self, chunks, fan_in, reasoning_type):
+        # Prompt sizes of every chunk and merge call, with the longest catalog system prompt and
+        # merges of expected_output_tokens-long summaries.
+        system_prompts = self.prompt_generator.generate_system_prompts("summarization", reasoning_type=reasoning_type or "standard")
+        system_prompt = max(system_prompts, key=len)
+        overhead = estimate_tokens(self.prompt_generator.generate_prompt("summarization", system_prompt, text=""))
+        planned = [estimate_tokens(self.prompt_generator.generate_prompt("summarization", system_prompt, text=chunk))
+                   for chunk in chunks]
+        parts = len(chunks)
+        while parts > 1:
+            merged = -(-parts // fan_in)
+            planned += [overhead + min(fan_in, parts - i * fan_in) * self.budget.expected_output_tokens for i in range(merged)]
+            parts = merged
+        return planned
+
+    def generate_code(self, task_description: str, language: str, reasoning_type: str, stream: bool = False):
         input_kwargs = {"task_description": task_description, "language": language}
-        return self.optimize_prompt("code_generation", "code_generation", input_kwargs, self.gemini_model, language, reasoning_type=reasoning_type)
+        return self._run("code_generation", input_kwargs, language, reasoning_type=reasoning_type, stream=stream)
 
-    def extract_data(self, text: str, fields: list, reasoning_type: str):
+    def extract_data(self, text: str, fields: list, reasoning_type: str, use_retrieval: bool = False, stream: bool = False,
+                     collection: str = rag.COLLECTION_NAME):
+        # With an indexed document, only the chunks relevant to the fields go into the prompt.
+        if use_retrieval and self.has_indexed_document(collection):
+            text = self.retrieve_context(", ".join(fields), collection=collection)
         input_kwargs = {"text": text, "fields": ", ".join(fields)}
-        return self.optimize_prompt("data_extraction", "data_extraction", input_kwargs, self.gemini_model, reasoning_type=reasoning_type)
+        return self._run("data_extraction", input_kwargs, reasoning_type=reasoning_type, stream=stream)
 
-    def answer_question(self, context: str, question: str, reasoning_type: str):
+    def answer_question(self, context: str, question: str, reasoning_type: str, use_retrieval: bool = False, stream: bool = False,
+                        collection: str = rag.COLLECTION_NAME):
+        if use_retrieval and self.has_indexed_document(collection):
+            context = self.retrieve_context(question, collection=collection)
         input_kwargs = {"context": context, "question": question}
-        return self.optimize_prompt("question_answering", "question_answering", input_kwargs, self.gemini_model, reasoning_type=reasoning_type)
\ No newline at end of file
+        return self._run("question_answering", input_kwargs, reasoning_type=reasoning_type, stream=stream)
+
+    # ===== Retrieval (RAG) =====
+
+    def extract_text_from_pdf(self, pdf_path: str) -> str:
+        return rag.extract_text_from_pdf(pdf_path)
+
+    def chunk_text(self, text, chunk_size: int = rag.CHUNK_SIZE, overlap: int = rag.CHUNK_OVERLAP):
+        return rag.chunk_text(text, chunk_size, overlap)
+
+    def get_embeddings(self, chunks):
+        return rag.get_embeddings(chunks)
+
+    def _setup_rag_collection(self, collection: str = rag.COLLECTION_NAME) -> bool:
+        try:
+            return rag.setup_collection(rag.get_qdrant_client(), collection)
+        except Exception as e:
+            notify("error", f"Error setting up the vector collection: {e}")
+            return False
+
+    def upload_to_qdrant(self, chunks, embeddings, collection: str = rag.COLLECTION_NAME) -> bool:
+        try:
+            return rag.upload_chunks(rag.get_qdrant_client(), chunks, embeddings, collection)
+        except Exception as e:
+            notify("error", f"Error indexing document chunks: {e}")
+            return False
+
+    def index_document(self, pdf_bytes: bytes, name: Optional[str] = None) -> dict:
+        """Extract, chunk, embed and index a PDF, reusing whatever the document store already has.
+
+        The chunks go into a collection named after the content hash, returned
+        as ``collection``; pass it to the retrieval methods.
+        """
+        if self.document_store is None:
+            raise ValueError("index_document requires a document_store")
+        from .document_store import content_hash
+        document_hash = content_hash(pdf_bytes)
+        if self.document_store.has_document(document_hash):
+            stats = None
+        else:
+            with span("pdf_extract"):
+                pages = list(rag.iter_pdf_pages(io.BytesIO(pdf_bytes)))
+            stats = self.document_store.add_document(
+                document_hash, name, "\n".join(pages), rag.chunk_pages(pages), self.get_embeddings)
+        text, chunks, embeddings = self.document_store.get_document(document_hash)
+        if stats is None:
+            stats = {"chunks": len(chunks), "embedded": 0, "reused": len(chunks)}
+        collection = rag.collection_for(document_hash)
+        if not chunks:
+            indexed = False
+        elif self._indexed_chunks(collection) == len(chunks):
+            # Identical content maps to the same collection, so a complete one is reused as is.
+            indexed = True
+        else:
+            indexed = self._setup_rag_collection(collection) and self.upload_to_qdrant(chunks, embeddings, collection)
+        return {**stats, "hash": document_hash, "text": text, "chunks": chunks, "indexed": indexed, "collection": collection}
+
+    def _indexed_chunks(self, collection: str) -> int:
+        try:
+            client = rag.get_qdrant_client()
+            return client.count(collection).count if client.collection_exists(collection) else 0
+        except Exception:
+            return 0
+
+    def has_indexed_document(self, collection: str = rag.COLLECTION_NAME) -> bool:
+        return rag.has_documents(rag.get_qdrant_client(), collection)
+
+    def retrieve_context(self, query: str, top_k: int = rag.TOP_K, collection: str = rag.COLLECTION_NAME) -> str:
+        return "\n\n".join(rag.retrieve(rag.get_qdrant_client(), query, top_k, collection))
\ No newline at end of file
@@ -0,0 +1,355 @@
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+
+class TextResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class ModelBackend:
+    """Interface every model backend implements.
+
+    It mirrors ``genai.GenerativeModel.generate_content``: the call returns an
+    object with a ``text`` attribute, or with ``stream=True`` an iterator of
+    such objects.
+    """
+
+    model_name = "unknown"
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        raise NotImplementedError
+
+
+class GeminiBackend(ModelBackend):
+    def __init__(self, model_name: str = "gemini-1.5-flash", api_key: Optional[str] = None, generation_config: Optional[dict] = None):
+        self.model_name = model_name
+        self.generation_config = generation_config
+        self._api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not self._api_key:
+            raise ValueError("GEMINI_API_KEY not found in environment variables.")
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        # The SDK client is created once and reused by every thread.
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self._api_key)
+                self._model = genai.GenerativeModel(self.model_name, generation_config=self.generation_config)
+            return self._model
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        return self.model.generate_content(prompt, stream=stream, **kwargs)
+
+
+class HFBackend(ModelBackend):
+    """Local Hugging Face text-generation pipeline."""
+
+    def __init__(self, model_name: str = "Salesforce/codegen-350M-mono", device: int = -1, max_new_tokens: int = 256):
+        self.model_name = model_name
+        self.device = device
+        self.generation_config = {"max_new_tokens": max_new_tokens}
+        self._pipeline = None
+        self._lock = threading.Lock()
+
+    @property
+    def pipeline(self):
+        with self._lock:
+            if self._pipeline is None:
+                from transformers import pipeline
+                self._pipeline = pipeline("text-generation", model=self.model_name, device=self.device)
+            return self._pipeline
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        generated = self.pipeline(prompt, return_full_text=False, **self.generation_config)
+        response = TextResponse(generated[0]["generated_text"])
+        # The pipeline produces the whole completion at once.
+        return iter([response]) if stream else response
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``acquire`` blocks until a request may be sent.
+
+    ``rate`` is in requests per second. When the backend reports a rate
+    limit, ``throttle`` halves the rate (down to ``min_rate``) and every
+    success adds back a little, so throughput settles under the quota.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, min_rate: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def throttle(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+
+    def recover(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class CircuitBreaker:
+    """Fails calls fast after ``failure_threshold`` consecutive failures.
+
+    After ``reset_timeout`` seconds one trial call is let through; success
+    closes the circuit again, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half_open" and self._trial_in_flight):
+                raise CircuitOpenError(f"Circuit open after {self.failures} consecutive failures")
+            if state == "half_open":
+                self._trial_in_flight = True
+
+    def retry_after(self) -> float:
+        """Seconds until a call might be let through again."""
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            # While the half-open trial runs, check back shortly.
+            return max(0.05, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release(self):
+        # The call ended without saying anything about the backend's health.
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    # google.api_core raises ResourceExhausted (HTTP 429) for quota errors.
+    return getattr(error, "code", None) == 429 or type(error).__name__ in ("ResourceExhausted", "TooManyRequests")
+
+
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+TRANSIENT_ERRORS = ("ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "GatewayTimeout", "Aborted", "BadGateway")
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Whether retrying could help: quota, server and network errors, not bad requests."""
+    if is_rate_limit_error(error) or isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    code = getattr(error, "code", None)
+    return code in TRANSIENT_STATUS_CODES or type(error).__name__ in TRANSIENT_ERRORS
+
+
+class ResilientBackend(ModelBackend):
+    """Wraps a backend with rate limiting, jittered retries and a circuit breaker.
+
+    Only transient errors are retried; quota errors get ``max_rate_limit_retries``
+    attempts and slow the rate limiter down instead of counting towards the
+    breaker, which records one failure per call that exhausted its retries.
+    While the circuit is open a call waits up to ``max_wait`` seconds for it
+    to let calls through again.
+    """
+
+    def __init__(self, backend: ModelBackend, requests_per_second: Optional[float] = None, burst: Optional[float] = None,
+                 max_retries: int = 3, max_rate_limit_retries: int = 8, backoff_base: float = 0.5, backoff_max: float = 20.0,
+                 breaker: Optional[CircuitBreaker] = None, max_wait: float = 60.0, sleep: Callable[[float], None] = time.sleep):
+        self.backend = backend
+        self.limiter = TokenBucket(requests_per_second, burst) if requests_per_second else None
+        self.max_retries = max_retries
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.max_wait = max_wait
+        self._sleep = sleep
+        self.retries = 0
+        self.rate_limited = 0
+
+    @property
+    def model_name(self):
+        return self.backend.model_name
+
+    @property
+    def generation_config(self):
+        return getattr(self.backend, "generation_config", None)
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": a uniform delay up to the exponential cap.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _enter_breaker(self):
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            try:
+                self.breaker.before_call()
+                return
+            except CircuitOpenError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise
+                self._sleep(min(self.breaker.retry_after(), remaining))
+
+    def _call(self, call):
+        self._enter_breaker()
+        attempt = rate_limited_attempts = 0
+        try:
+            while True:
+                if self.limiter is not None:
+                    self.limiter.acquire()
+                try:
+                    result = call()
+                except Exception as e:
+                    rate_limited = is_rate_limit_error(e)
+                    if rate_limited:
+                        self.rate_limited += 1
+                        rate_limited_attempts += 1
+                        if self.limiter is not None:
+                            self.limiter.throttle()
+                    if rate_limited:
+                        retries_left = rate_limited_attempts <= self.max_rate_limit_retries
+                    else:
+                        retries_left = attempt < self.max_retries
+                    if not is_transient_error(e) or not retries_left:
+                        raise
+                    self.retries += 1
+                    delay = self._backoff(rate_limited_attempts if rate_limited else attempt)
+                    # Quota errors need a longer pause than transient failures.
+                    self._sleep(max(delay, self.backoff_base * 2) if rate_limited else delay)
+                    if not rate_limited:
+                        attempt += 1
+                    continue
+                if self.limiter is not None:
+                    self.limiter.recover()
+                break
+        except Exception as e:
+            # Quota and bad-request errors say nothing about whether the service is up.
+            if is_transient_error(e) and not is_rate_limit_error(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        if not stream:
+            return self._call(lambda: self.backend.generate_content(prompt, **kwargs))
+        return self._stream(prompt, **kwargs)
+
+    def _stream(self, prompt, **kwargs) -> Iterator:
+        # Retry until the first chunk arrives; a failure after that cannot be
+        # replayed without duplicating the tokens already handed out.
+        def first_chunk():
+            chunks = iter(self.backend.generate_content(prompt, stream=True, **kwargs))
+            return chunks, next(chunks, None)
+
+        chunks, first = self._call(first_chunk)
+        if first is not None:
+            yield first
+            yield from chunks
+
+
+def _fake_backend(**options):
+    from .fake_model import FakeModel
+    return FakeModel(**options)
+
+
+BACKENDS: Dict[str, Callable[..., ModelBackend]] = {
+    "gemini": GeminiBackend,
+    "hf": HFBackend,
+    "fake": _fake_backend,
+}
+
+# Gemini's quota is per project, so it always gets a rate limiter that 429s can slow down.
+DEFAULT_GEMINI_REQUESTS_PER_MINUTE = 120
+DEFAULT_GEMINI_BURST = 10
+
+_shared: Dict[Tuple, ModelBackend] = {}
+_shared_lock = threading.Lock()
+
+
+def _default_options(factory) -> dict:
+    return {parameter.name: parameter.default for parameter in inspect.signature(factory).parameters.values()
+            if parameter.default is not inspect.Parameter.empty}
+
+
+def get_backend(name: str = "gemini", resilient: bool = True, **options) -> ModelBackend:
+    """Return the process-wide backend for ``name`` and ``options``, creating it once.
+
+    Sharing one instance means every SpecializedApplications reuses the same
+    client, rate limiter and circuit breaker. Options prefixed with
+    ``resilience_`` configure the ResilientBackend wrapper; the rest go to the
+    backend. ``GEMINI_REQUESTS_PER_MINUTE`` overrides the default Gemini rate limit.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown model backend: {name}")
+    # Fill in the backend's defaults so get_backend("gemini") and an explicit default
+    # model_name share one instance. Options may hold dicts, so key on a serialized form.
+    options = {**_default_options(BACKENDS[name]), **options}
+    key = (name, resilient, json.dumps(options, sort_keys=True, default=repr))
+    with _shared_lock:
+        backend = _shared.get(key)
+        if backend is None:
+            resilience = {k[len("resilience_"):]: v for k, v in options.items() if k.startswith("resilience_")}
+            backend = BACKENDS[name](**{k: v for k, v in options.items() if not k.startswith("resilience_")})
+            if resilient:
+                if name == "gemini" and "requests_per_second" not in resilience:
+                    rpm = os.getenv("GEMINI_REQUESTS_PER_MINUTE") or DEFAULT_GEMINI_REQUESTS_PER_MINUTE
+                    resilience["requests_per_second"] = float(rpm) / 60
+                    resilience.setdefault("burst", DEFAULT_GEMINI_BURST)
+                backend = ResilientBackend(backend, **resilience)
+            _shared[key] = backend
+        return backend
@@ -0,0 +1,231 @@
+"""Headless batch runner for PromptEngineeringSystem.
+
+    python -m prompt_engineering_system.batch records.jsonl results.jsonl --workers 8 --resume
+
+Each input record holds ``task_type``, an optional ``reasoning_type`` and
+``id``, and the keyword arguments of the task (``text``, ``fields``, ...).
+Records are streamed from JSONL or CSV and results are appended to a JSONL
+file as they finish, so an interrupted run can be resumed with ``--resume``.
+With ``--shared-pool`` a record's optional ``priority`` orders its calls.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Set
+
+from .applications import WARM_START_MODES
+from .backends import BACKENDS
+from .budget import PromptBudget
+from .scheduler import TaskScheduler
+from .tracing import JsonLinesSink, PrometheusSink
+from .cache import ResponseCache
+from .main import PromptEngineeringSystem
+from .memory import PromptMemory
+from .search import STRATEGIES, get_strategy
+
+
+# CSV cells are always strings; these columns are converted before dispatch.
+BOOLEAN_COLUMNS = ("long_document", "use_retrieval")
+INTEGER_COLUMNS = ("priority",)
+_TRUE = {"true", "1", "yes", "y", "on"}
+_FALSE = {"false", "0", "no", "n", "off", ""}
+
+
+def parse_bool(value) -> bool:
+    if not isinstance(value, str):
+        return bool(value)
+    text = value.strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f"Not a boolean: {value!r}")
+
+
+def read_records(path: str, fmt: Optional[str] = None) -> Iterator[Dict]:
+    """Yield records one at a time; ``id`` defaults to the record's position."""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for position, record in enumerate(rows):
+            record.setdefault("id", position)
+            if isinstance(record.get("fields"), str):
+                record["fields"] = [field.strip() for field in record["fields"].split(",") if field.strip()]
+            for column in BOOLEAN_COLUMNS:
+                if column in record:
+                    record[column] = parse_bool(record[column])
+            for column in INTEGER_COLUMNS:
+                if isinstance(record.get(column), str):
+                    value = record[column].strip()
+                    record[column] = int(value) if value else 0
+            yield record
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids that already have a successful result; failed records are retried."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                # A partially written last line from an interrupted run.
+                continue
+            if "id" in row and "error" not in row:
+                done.add(str(row["id"]))
+    return done
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+class BatchRunner:
+    def __init__(self, system: PromptEngineeringSystem, workers: int = 4, scheduler: Optional[TaskScheduler] = None):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.system = system
+        self.workers = workers
+        # With a scheduler, every record's candidate calls share its pool and identical prompts run once.
+        self.scheduler = scheduler
+        self.latencies = []
+        self.errors = 0
+        self.skipped = 0
+
+    def _run_one(self, record: Dict) -> Dict:
+        kwargs = {k: v for k, v in record.items() if k not in ("id", "task_type", "priority")}
+        start = time.perf_counter()
+        try:
+            if self.scheduler is not None:
+                with self.scheduler.flow(int(record.get("priority") or 0)):
+                    result = self.system.run_application(record["task_type"], **kwargs)
+            else:
+                result = self.system.run_application(record["task_type"], **kwargs)
+            row = {"id": record["id"], "task_type": record["task_type"], "result": result}
+        except Exception as e:
+            row = {"id": record["id"], "task_type": record.get("task_type"), "error": f"{type(e).__name__}: {e}"}
+        row["latency"] = time.perf_counter() - start
+        return row
+
+    def run(self, records: Iterator[Dict], output_path: str, resume: bool = False, progress_every: int = 100) -> Dict:
+        done = completed_ids(output_path) if resume else set()
+        if resume and os.path.exists(output_path) and os.path.getsize(output_path):
+            with open(output_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                truncated = f.read(1) != b"\n"
+            if truncated:
+                with open(output_path, "a", encoding="utf-8") as f:
+                    f.write("\n")
+        start = time.perf_counter()
+        completed = 0
+        with open(output_path, "a" if resume else "w", encoding="utf-8") as out, \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as pool:
+            pending = set()
+
+            def drain(return_when):
+                nonlocal pending, completed
+                finished, pending = wait(pending, return_when=return_when)
+                for future in finished:
+                    row = future.result()
+                    out.write(json.dumps(row, default=str) + "\n")
+                    out.flush()
+                    self.latencies.append(row["latency"])
+                    self.errors += "error" in row
+                    completed += 1
+                    if progress_every and completed % progress_every == 0:
+                        print(f"{completed} records done", file=sys.stderr)
+
+            for record in records:
+                if str(record["id"]) in done:
+                    self.skipped += 1
+                    continue
+                # Keep a bounded window of records in memory.
+                if len(pending) >= self.workers * 2:
+                    drain(FIRST_COMPLETED)
+                pending.add(pool.submit(self._run_one, record))
+            drain(ALL_COMPLETED)
+
+        elapsed = time.perf_counter() - start
+        return {
+            "records": completed,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "elapsed": elapsed,
+            "throughput": completed / elapsed if elapsed else 0.0,
+            "p50_latency": percentile(self.latencies, 50),
+            "p95_latency": percentile(self.latencies, 95),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run PromptEngineeringSystem over a JSONL or CSV dataset.")
+    parser.add_argument("input", help="JSONL or CSV file of task records")
+    parser.add_argument("output", help="JSONL file results are appended to")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input format (default: from the file extension)")
+    parser.add_argument("--workers", type=int, default=4, help="Records processed in parallel")
+    parser.add_argument("--candidate-workers", type=int, default=4, help="Concurrent candidate calls per record")
+    parser.add_argument("--resume", action="store_true", help="Skip records whose id is already in the output")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default="exhaustive", help="System prompt search strategy")
+    parser.add_argument("--cache-dir", help="Directory for an on-disk response cache")
+    parser.add_argument("--memory", help="SQLite file recording winning system prompts")
+    parser.add_argument("--warm-start", choices=WARM_START_MODES, default="off", help="How to reuse recorded winners")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="Model backend (default: Gemini)")
+    parser.add_argument("--fake-model", action="store_true", help="Shorthand for --backend fake")
+    parser.add_argument("--max-prompt-tokens", type=int, help="Truncate context so each prompt fits this many tokens")
+    parser.add_argument("--max-request-tokens", type=int, help="Token ceiling per record across all candidates")
+    parser.add_argument("--max-request-cost", type=float, help="Cost ceiling per record in USD")
+    parser.add_argument("--shared-pool", type=int, metavar="N",
+                        help="Run all candidate calls on one pool of N workers, deduplicating identical prompts")
+    parser.add_argument("--trace-log", help="JSONL file receiving per-record timing spans")
+    parser.add_argument("--metrics-file", help="Write aggregated timings in the Prometheus text format here")
+    args = parser.parse_args(argv)
+
+    options = {
+        "max_workers": args.candidate_workers,
+        "search_strategy": get_strategy(args.strategy),
+        "warm_start": args.warm_start,
+    }
+    if args.cache_dir:
+        options["cache"] = ResponseCache(disk_dir=args.cache_dir)
+    if args.memory:
+        options["memory"] = PromptMemory(args.memory)
+    if args.backend or args.fake_model:
+        options["backend"] = "fake" if args.fake_model else args.backend
+    if args.max_prompt_tokens or args.max_request_tokens or args.max_request_cost:
+        options["budget"] = PromptBudget(args.max_prompt_tokens, args.max_request_tokens, args.max_request_cost)
+    sinks = []
+    if args.trace_log:
+        sinks.append(JsonLinesSink(args.trace_log))
+    if args.metrics_file:
+        sinks.append(PrometheusSink())
+    scheduler = TaskScheduler(args.shared_pool) if args.shared_pool else None
+    runner = BatchRunner(PromptEngineeringSystem(trace_sinks=sinks, **options), workers=args.workers, scheduler=scheduler)
+    try:
+        stats = runner.run(read_records(args.input, args.format), args.output, resume=args.resume)
+    finally:
+        if scheduler is not None:
+            scheduler.close()
+    if args.metrics_file:
+        sinks[-1].write(args.metrics_file)
+    print(
+        f"{stats['records']} records ({stats['skipped']} skipped, {stats['errors']} errors) "
+        f"in {stats['elapsed']:.1f}s: {stats['throughput']:.2f} records/s, "
+        f"p50 {stats['p50_latency']:.2f}s, p95 {stats['p95_latency']:.2f}s"
+    )
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import math
+import re
+from typing import Dict, Iterable, Optional, Tuple
+
+# Gemini and most BPE tokenizers average about four characters per token of
+# English text; close enough to plan a budget without a tokenizer call.
+CHARS_PER_TOKEN = 4
+
+# USD per million (input, output) tokens.
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
+
+# Input fields that carry documents and may be shortened to fit a budget.
+CONTEXT_FIELDS = ("text", "context")
+
+TRUNCATION_MARKER = "\n[...]\n"
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def compress_whitespace(text: str) -> str:
+    # PDF extraction leaves runs of spaces and blank lines that cost tokens and carry nothing.
+    text = re.sub(r"[ \t\f\v]+", " ", text)
+    text = re.sub(r" ?\n ?", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Shorten ``text`` to about ``max_tokens``, keeping its head and tail."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    keep = max(0, max_tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARKER))
+    head = keep * 2 // 3
+    tail = keep - head
+    return text[:head] + TRUNCATION_MARKER + (text[-tail:] if tail else "")
+
+
+def price_for(model_name: str, pricing: Optional[Dict[str, Tuple[float, float]]] = None) -> Tuple[float, float]:
+    pricing = pricing if pricing is not None else MODEL_PRICING
+    name = model_name.rsplit("/", 1)[-1]
+    return pricing.get(name, (0.0, 0.0))
+
+
+def estimate_cost(model_name: str, prompt_tokens: int, output_tokens: int,
+                  pricing: Optional[Dict[str, Tuple[float, float]]] = None) -> float:
+    input_price, output_price = price_for(model_name, pricing)
+    return (prompt_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+class PromptBudget:
+    """Per-request token and cost ceilings applied before any candidate is sent.
+
+    ``max_prompt_tokens`` caps every rendered prompt; ``max_request_tokens``
+    and ``max_request_cost`` cap the whole search, counting
+    ``expected_output_tokens`` for each candidate. Context fields are
+    whitespace-compressed (when ``compress`` is set) and then truncated so at
+    least one candidate fits; the candidate count is capped to the rest.
+    """
+
+    def __init__(self, max_prompt_tokens: Optional[int] = None, max_request_tokens: Optional[int] = None,
+                 max_request_cost: Optional[float] = None, expected_output_tokens: int = 512,
+                 compress: bool = True, pricing: Optional[Dict[str, Tuple[float, float]]] = None):
+        for name, value in (("max_prompt_tokens", max_prompt_tokens), ("max_request_tokens", max_request_tokens),
+                            ("max_request_cost", max_request_cost)):
+            if value is not None and value <= 0:
+                raise ValueError(f"{name} must be positive")
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_request_tokens = max_request_tokens
+        self.max_request_cost = max_request_cost
+        self.expected_output_tokens = expected_output_tokens
+        self.compress = compress
+        self.pricing = pricing
+
+    def cost(self, model_name: str, prompt_tokens: int, output_tokens: int) -> float:
+        return estimate_cost(model_name, prompt_tokens, output_tokens, self.pricing)
+
+    def prompt_limit(self, model_name: str) -> Optional[int]:
+        """The most prompt tokens a single candidate may use, or None if unlimited."""
+        limits = []
+        if self.max_prompt_tokens is not None:
+            limits.append(self.max_prompt_tokens)
+        if self.max_request_tokens is not None:
+            limits.append(self.max_request_tokens - self.expected_output_tokens)
+        input_price, output_price = price_for(model_name, self.pricing)
+        if self.max_request_cost is not None and input_price:
+            spare = self.max_request_cost * 1_000_000 - self.expected_output_tokens * output_price
+            limits.append(int(spare / input_price))
+        return max(1, min(limits)) if limits else None
+
+    def fit_context(self, input_kwargs: dict, overhead_tokens: int, model_name: str) -> Tuple[dict, bool]:
+        """Compress and truncate context fields so a prompt with ``overhead_tokens`` of template fits.
+
+        Returns the new kwargs and whether anything was truncated.
+        """
+        fitted = dict(input_kwargs)
+        fields = [name for name in CONTEXT_FIELDS if isinstance(fitted.get(name), str)]
+        if self.compress:
+            for name in fields:
+                fitted[name] = compress_whitespace(fitted[name])
+        limit = self.prompt_limit(model_name)
+        if limit is None or not fields:
+            return fitted, False
+        sizes = {name: estimate_tokens(fitted[name]) for name in fields}
+        total = sum(sizes.values())
+        available = max(0, limit - overhead_tokens)
+        if total <= available:
+            return fitted, False
+        # Several context fields share the allowance in proportion to their size.
+        for name in fields:
+            fitted[name] = truncate_to_tokens(fitted[name], available * sizes[name] // total)
+        return fitted, True
+
+    def max_candidates(self, prompt_tokens: Iterable[int], model_name: str) -> Optional[int]:
+        """How many of the prompts, taken in order, fit the request ceilings (None if unlimited)."""
+        if self.max_request_tokens is None and self.max_request_cost is None:
+            return None
+        tokens = cost = 0.0
+        count = 0
+        for prompt in prompt_tokens:
+            tokens += prompt + self.expected_output_tokens
+            cost += self.cost(model_name, prompt, self.expected_output_tokens)
+            if self.max_request_tokens is not None and tokens > self.max_request_tokens:
+                break
+            if self.max_request_cost is not None and cost > self.max_request_cost:
+                break
+            count += 1
+        # fit_context already sized one prompt to fit, so always try at least one.
+        return max(1, count)
+
+    def planned_usage(self, prompt_tokens: Iterable[int], model_name: str) -> Tuple[int, float]:
+        """Tokens and cost of calls with these prompt sizes, counting ``expected_output_tokens`` for each."""
+        tokens = cost = 0
+        for prompt in prompt_tokens:
+            tokens += prompt + self.expected_output_tokens
+            cost += self.cost(model_name, prompt, self.expected_output_tokens)
+        return tokens, cost
+
+    def exceeds(self, tokens: int, cost: float) -> bool:
+        return ((self.max_request_tokens is not None and tokens > self.max_request_tokens)
+                or (self.max_request_cost is not None and cost > self.max_request_cost))
+
+    def remaining(self, tokens: int, cost: float) -> Optional["PromptBudget"]:
+        """The budget left after spending ``tokens`` and ``cost``, or None when a ceiling is used up."""
+        max_request_tokens = max_request_cost = None
+        if self.max_request_tokens is not None:
+            max_request_tokens = self.max_request_tokens - tokens
+            if max_request_tokens <= 0:
+                return None
+        if self.max_request_cost is not None:
+            max_request_cost = self.max_request_cost - cost
+            if max_request_cost <= 0:
+                return None
+        return PromptBudget(self.max_prompt_tokens, max_request_tokens, max_request_cost,
+                            self.expected_output_tokens, self.compress, self.pricing)
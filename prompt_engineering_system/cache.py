@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+def make_key(model_name: str, prompt: str, generation_config: Any = None) -> str:
+    payload = json.dumps([model_name, prompt, generation_config], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def model_cache_key(model, prompt: str) -> str:
+    model_name = getattr(model, "model_name", type(model).__name__)
+    # genai.GenerativeModel keeps its config in a private attribute.
+    generation_config = getattr(model, "generation_config", getattr(model, "_generation_config", None))
+    return make_key(model_name, prompt, generation_config)
+
+
+class ResponseCache:
+    """Content-addressed cache of model outputs.
+
+    Entries live in an in-memory LRU tier and, when ``disk_dir`` is set, in a
+    directory of JSON files that survives restarts. Both tiers honour ``ttl``;
+    the memory tier holds at most ``max_entries`` and the disk tier at most
+    ``max_disk_bytes``, evicting least recently used entries first.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None,
+                 disk_dir: Optional[str] = None, max_disk_bytes: Optional[int] = 256 * 1024 * 1024):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_bytes = sum(entry.stat().st_size for entry in os.scandir(disk_dir) if entry.is_file())
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.evictions += 1
+            value, expires_at = self._disk_get(key, now)
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._memory_set(key, value, expires_at)
+            return value
+
+    def set(self, key: str, value: str):
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._memory_set(key, value, expires_at)
+            self._disk_set(key, value, expires_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self.disk_dir:
+                for entry in os.scandir(self.disk_dir):
+                    if entry.is_file():
+                        os.remove(entry.path)
+                self._disk_bytes = 0
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def _memory_set(self, key, value, expires_at):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _disk_get(self, key, now):
+        if not self.disk_dir:
+            return None, None
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None, None
+        if entry["expires_at"] is not None and entry["expires_at"] <= now:
+            self._disk_remove(path)
+            return None, None
+        # Touch the file so size-based eviction is least recently used.
+        os.utime(path)
+        return entry["value"], entry["expires_at"]
+
+    def _disk_set(self, key, value, expires_at):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        data = json.dumps({"value": value, "expires_at": expires_at}).encode("utf-8")
+        if os.path.exists(path):
+            self._disk_bytes -= os.path.getsize(path)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._disk_bytes += len(data)
+        if self.max_disk_bytes is not None and self._disk_bytes > self.max_disk_bytes:
+            self._disk_evict(keep=path)
+
+    def _disk_evict(self, keep):
+        entries = sorted(
+            (entry for entry in os.scandir(self.disk_dir) if entry.is_file() and entry.path != keep),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            self._disk_remove(entry.path)
+
+    def _disk_remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        self._disk_bytes -= size
+        self.evictions += 1
@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+from string import Formatter
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt_catalog.json")
+
+
+class CompiledTemplate:
+    """A ``str.format`` template parsed once into literal text and field names.
+
+    Templates that use conversions, format specs or attribute/index lookups
+    fall back to ``str.format``.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        self.parts = []
+        self.simple = True
+        for literal, field, spec, conversion in Formatter().parse(template):
+            if field is not None and (spec or conversion or not field.isidentifier()):
+                self.simple = False
+            self.parts.append((literal, field))
+        self.fields = frozenset(field for _, field in self.parts if field)
+
+    def render(self, **kwargs) -> str:
+        if not self.simple:
+            return self.template.format(**kwargs)
+        out = []
+        for literal, field in self.parts:
+            out.append(literal)
+            if field is not None:
+                value = kwargs[field]
+                out.append(value if isinstance(value, str) else format(value))
+        return "".join(out)
+
+
+class PromptCatalog:
+    """System prompts, reasoning modifiers and templates loaded from a JSON file.
+
+    The file is compiled once into per-task template lists, and expanded
+    system prompt groups are memoised per (task, language, reasoning type).
+    When ``check_interval`` is set the file's mtime is checked at most that
+    often and the catalog is recompiled in place if it changed; a file that
+    fails to load leaves the previous catalog in use.
+    """
+
+    def __init__(self, path: str = DEFAULT_CATALOG_PATH, check_interval: Optional[float] = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._mtime = os.path.getmtime(path)
+        self._compile(self._load())
+
+    def _load(self) -> dict:
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _compile(self, data: dict):
+        self.base_prompts = {task: [CompiledTemplate(p) for p in prompts] for task, prompts in data["base_prompts"].items()}
+        self.default_prompts = [CompiledTemplate(p) for p in data.get("default_prompts", ["You are a helpful assistant."])]
+        self.reasoning_modifiers = {name: list(mods) for name, mods in data.get("reasoning_modifiers", {}).items()}
+        self.templates = {name: CompiledTemplate(t) for name, t in data.get("templates", {}).items()}
+        self._groups = {}
+
+    def reload(self) -> bool:
+        with self._lock:
+            try:
+                # Remember the mtime even on failure so a broken file is reported once.
+                self._mtime = os.path.getmtime(self.path)
+                self._compile(self._load())
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning("Keeping the previous prompt catalog, failed to reload %s: %s", self.path, e)
+                return False
+            return True
+
+    def _maybe_reload(self):
+        if self.check_interval is None:
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        try:
+            changed = os.path.getmtime(self.path) != self._mtime
+        except OSError:
+            return
+        if changed:
+            self.reload()
+
+    def system_prompt_groups(self, task_type: str, language: Optional[str] = None,
+                             reasoning_type: str = "standard") -> Tuple[Tuple[str, ...], ...]:
+        self._maybe_reload()
+        key = (task_type, language, reasoning_type)
+        groups = self._groups.get(key)
+        if groups is not None:
+            return groups
+        # language was interpolated with an f-string, so None renders as "None"
+        prompts = [p.render(language=language) for p in self.base_prompts.get(task_type, self.default_prompts)]
+        modifiers = self.reasoning_modifiers.get(reasoning_type)
+        if modifiers:
+            groups = tuple(tuple(f"{prompt} {modifier}" for modifier in modifiers) for prompt in prompts)
+        else:
+            groups = tuple((prompt,) for prompt in prompts)
+        self._groups[key] = groups
+        return groups
+
+    def template(self, name: str) -> Optional[CompiledTemplate]:
+        self._maybe_reload()
+        return self.templates.get(name)
+
+
+@lru_cache(maxsize=None)
+def get_default_catalog() -> PromptCatalog:
+    return PromptCatalog()
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .rag import VECTOR_SIZE
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    hash TEXT PRIMARY KEY,
+    row INTEGER NOT NULL UNIQUE,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    hash TEXT PRIMARY KEY,
+    name TEXT,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS document_chunks (
+    document TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    chunk TEXT NOT NULL,
+    PRIMARY KEY (document, position)
+);
+"""
+
+
+def content_hash(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class DocumentStore:
+    """Persistent, content-addressed store of document chunks and their embeddings.
+
+    Documents and chunks are keyed by the SHA-256 of their content, so a
+    re-uploaded file is recognised without re-extracting it and an edited
+    file only embeds the chunks that changed. Embeddings are rows of a
+    float32 file opened with ``np.memmap``, so a large corpus is available at
+    startup without being read into memory. Metadata lives in SQLite.
+    """
+
+    def __init__(self, root: str = ".document_store", dim: int = VECTOR_SIZE):
+        self.root = root
+        self.dim = dim
+        os.makedirs(root, exist_ok=True)
+        self.db_path = os.path.join(root, "store.db")
+        self.vectors_path = os.path.join(root, "embeddings.f32")
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+            self._rows = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        if not os.path.exists(self.vectors_path):
+            open(self.vectors_path, "wb").close()
+        self._vectors = self._open_vectors()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _capacity(self) -> int:
+        return os.path.getsize(self.vectors_path) // (4 * self.dim)
+
+    def _open_vectors(self) -> Optional[np.memmap]:
+        if self._capacity() == 0:
+            return None
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self._capacity(), self.dim))
+
+    def _reserve(self, rows: int):
+        capacity = self._capacity()
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, 1024)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self.vectors_path, "r+b") as f:
+            f.truncate(new_capacity * 4 * self.dim)
+        self._vectors = self._open_vectors()
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        if self._vectors is None:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return self._vectors[:self._rows]
+
+    def has_document(self, document_hash: str) -> bool:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT 1 FROM documents WHERE hash = ?", (document_hash,)).fetchone() is not None
+
+    def add_document(self, document_hash: str, name: Optional[str], text: str, chunks: List[str],
+                     embed: Callable[[List[str]], np.ndarray]) -> Dict[str, int]:
+        """Store a document, embedding only chunks the store has not seen before."""
+        hashes = [content_hash(chunk) for chunk in chunks]
+        with self._lock, closing(self._connect()) as conn, conn:
+            known = set()
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT hash FROM chunks WHERE hash IN ({','.join('?' * len(batch))})", batch).fetchall()
+                known.update(row[0] for row in rows)
+
+            new = {}
+            for chunk_hash, chunk in zip(hashes, chunks):
+                if chunk_hash not in known and chunk_hash not in new:
+                    new[chunk_hash] = chunk
+            if new:
+                vectors = np.asarray(embed(list(new.values())), dtype=np.float32)
+                if vectors.shape != (len(new), self.dim):
+                    raise ValueError(f"Expected embeddings of shape {(len(new), self.dim)}, got {vectors.shape}")
+                first = self._rows
+                self._reserve(first + len(new))
+                self._vectors[first:first + len(new)] = vectors
+                self._vectors.flush()
+                conn.executemany(
+                    "INSERT INTO chunks (hash, row, text) VALUES (?, ?, ?)",
+                    [(chunk_hash, first + i, chunk) for i, (chunk_hash, chunk) in enumerate(new.items())],
+                )
+                self._rows = first + len(new)
+
+            conn.execute("INSERT OR REPLACE INTO documents (hash, name, text) VALUES (?, ?, ?)", (document_hash, name, text))
+            conn.execute("DELETE FROM document_chunks WHERE document = ?", (document_hash,))
+            conn.executemany(
+                "INSERT INTO document_chunks (document, position, chunk) VALUES (?, ?, ?)",
+                [(document_hash, position, chunk_hash) for position, chunk_hash in enumerate(hashes)],
+            )
+        return {"chunks": len(chunks), "embedded": len(new), "reused": len(chunks) - len(new)}
+
+    def get_document(self, document_hash: str) -> Tuple[str, List[str], np.ndarray]:
+        """Return the document text, its chunks in order and their embedding rows."""
+        with closing(self._connect()) as conn:
+            document = conn.execute("SELECT text FROM documents WHERE hash = ?", (document_hash,)).fetchone()
+            if document is None:
+                raise KeyError(document_hash)
+            rows = conn.execute(
+                """
+                SELECT c.row, c.text FROM document_chunks d JOIN chunks c ON c.hash = d.chunk
+                WHERE d.document = ? ORDER BY d.position
+                """,
+                (document_hash,),
+            ).fetchall()
+        indices = np.array([row for row, _ in rows], dtype=np.int64)
+        return document[0], [text for _, text in rows], np.asarray(self.embeddings[indices])
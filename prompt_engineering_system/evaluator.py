@@ -1,17 +1,127 @@
-from rouge_score import rouge_scorer
-from sacrebleu.metrics import BLEU
+from array import array
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Sequence
+import math
+import threading
 import time
-import pandas as pd
 
-class PromptEvaluator:
+from .extraction import SourceIndex, score_extraction
+from .tracing import span
+
+ROUGE_TYPES = ("rouge1", "rouge2", "rougeL")
+
+
+def _fmeasure(overlap, candidate_total, reference_total):
+    precision = overlap / max(candidate_total, 1)
+    recall = overlap / max(reference_total, 1)
+    return 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0
+
+
+def _ngrams(tokens, n):
+    return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+
+class _Reference:
+    """A reference tokenized once and prepared for scoring many candidates."""
+
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+        self.length = len(tokens)
+        self.ngrams = {1: _ngrams(tokens, 1), 2: _ngrams(tokens, 2)}
+        # Bit i of masks[token] is set when tokens[i] == token (bit-parallel LCS).
+        self.masks = {}
+        for i, token in enumerate(tokens):
+            self.masks[token] = self.masks.get(token, 0) | (1 << i)
+        self.all_bits = (1 << self.length) - 1
+
+    def lcs(self, candidate: List[str]) -> int:
+        # Allison-Dix / Hyyro bit-vector LCS: one big-int step per candidate token.
+        v = self.all_bits
+        masks = self.masks
+        for token in candidate:
+            u = v & masks.get(token, 0)
+            v = ((v + u) | (v - u)) & self.all_bits
+        return self.length - bin(v).count("1")
+
+
+class MetricsHistory:
+    """Columnar, array-backed evaluation history with running totals.
+
+    Appends are O(1) and so are totals and means; ``len`` and iteration behave like
+    the list of dicts this replaces. Metrics missing from an entry are stored
+    as NaN and left out of that column's total and mean; the mean of a
+    column that was never measured is None.
+    """
+
+    COLUMNS = ("rouge1", "rouge2", "rougeL", "bleu", "extraction", "response_time", "cost", "prompt_tokens", "output_tokens")
+
     def __init__(self):
-        self.rouge = rouge_scorer.RougeScorer(['rouge1', 'rouge2', 'rougeL'], use_stemmer=True)
-        self.bleu = BLEU()
-        self.metrics_history = []
+        self._columns = {name: array("d") for name in self.COLUMNS}
+        self._totals = dict.fromkeys(self.COLUMNS, 0.0)
+        self._counts = dict.fromkeys(self.COLUMNS, 0)
+        self._lock = threading.Lock()
+
+    def append(self, evaluation: Dict[str, float]):
+        with self._lock:
+            for name in self.COLUMNS:
+                value = evaluation.get(name)
+                if value is None:
+                    self._columns[name].append(math.nan)
+                    continue
+                value = float(value)
+                self._columns[name].append(value)
+                self._totals[name] += value
+                self._counts[name] += 1
+
+    def __len__(self):
+        return len(self._columns[self.COLUMNS[0]])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield {name: self._columns[name][i] for name in self.COLUMNS}
+
+    def column(self, name: str) -> array:
+        return self._columns[name]
+
+    def total(self, name: str) -> float:
+        return self._totals[name]
+
+    def count(self, name: str) -> int:
+        return self._counts[name]
+
+    def mean(self, name: str) -> Optional[float]:
+        return self._totals[name] / self._counts[name] if self._counts[name] else None
+
+
+class PromptEvaluator:
+    def __init__(self, reference_cache_size: int = 8):
+        self._rouge = None
+        self._bleu = None
+        self.metrics_history = MetricsHistory()
+        self._references = OrderedDict()
+        self._indexes = OrderedDict()
+        self._reference_cache_size = reference_cache_size
+        self._lock = threading.Lock()
+
+    # rouge_score and sacrebleu are slow to import, so load them on first use.
+    @property
+    def rouge(self):
+        if self._rouge is None:
+            from rouge_score import rouge_scorer
+            self._rouge = rouge_scorer.RougeScorer(['rouge1', 'rouge2', 'rougeL'], use_stemmer=True)
+        return self._rouge
+
+    @property
+    def bleu(self):
+        if self._bleu is None:
+            from sacrebleu.metrics import BLEU
+            self._bleu = BLEU()
+        return self._bleu
 
     def evaluate(self, reference: str, candidate: str, start_time: float, cost: float = 0.0):
-        rouge_scores = self.rouge.score(reference, candidate)
-        bleu_score = self.bleu.sentence_score(candidate, [reference]).score
+        with span("score", candidates=1):
+            rouge_scores = self.rouge.score(reference, candidate)
+            bleu_score = self.bleu.sentence_score(candidate, [reference]).score
         response_time = time.time() - start_time
         evaluation = {
             "rouge1": rouge_scores['rouge1'].fmeasure,
@@ -24,15 +134,86 @@ class PromptEvaluator:
         self.metrics_history.append(evaluation)
         return evaluation
 
+    def record(self, evaluation: Dict[str, float]):
+        """Add an evaluation computed elsewhere (e.g. during prompt search) to the history."""
+        self.metrics_history.append(evaluation)
+
+    def _reference(self, reference: str) -> _Reference:
+        # optimize_prompt scores every batch against the same reference, so keep a few prepared.
+        with self._lock:
+            prepared = self._references.get(reference)
+            if prepared is not None:
+                self._references.move_to_end(reference)
+                return prepared
+        prepared = _Reference(self.rouge._tokenizer.tokenize(reference))
+        with self._lock:
+            self._references[reference] = prepared
+            while len(self._references) > self._reference_cache_size:
+                self._references.popitem(last=False)
+        return prepared
+
+    def _source_index(self, text: str) -> SourceIndex:
+        with self._lock:
+            index = self._indexes.get(text)
+            if index is not None:
+                self._indexes.move_to_end(text)
+                return index
+        index = SourceIndex(text)
+        with self._lock:
+            self._indexes[text] = index
+            while len(self._indexes) > self._reference_cache_size:
+                self._indexes.popitem(last=False)
+        return index
+
+    def score_extraction(self, text: str, output: str, fields: Sequence[str]) -> dict:
+        """Local extraction score of ``output`` against the source ``text``; see ``extraction.score_extraction``."""
+        with span("score", candidates=1):
+            return score_extraction(output, fields, self._source_index(text))
+
+    def score_batch(self, reference: str, candidates: Sequence[str], rouge_types: Sequence[str] = ROUGE_TYPES) -> List[Dict[str, float]]:
+        """ROUGE F-measures of every candidate against one reference.
+
+        Matches ``self.rouge.score`` but tokenizes and stems the reference
+        once and computes ROUGE-L with a bit-parallel LCS.
+        """
+        with span("score", candidates=len(candidates)):
+            return self._score_batch(reference, candidates, rouge_types)
+
+    def _score_batch(self, reference, candidates, rouge_types):
+        prepared = self._reference(reference)
+        results = []
+        for candidate in candidates:
+            tokens = self.rouge._tokenizer.tokenize(candidate) if candidate else []
+            scores = {}
+            for rouge_type in rouge_types:
+                if rouge_type == "rougeL":
+                    if not tokens or not prepared.length:
+                        scores[rouge_type] = 0.0
+                    else:
+                        scores[rouge_type] = _fmeasure(prepared.lcs(tokens), len(tokens), prepared.length)
+                else:
+                    n = int(rouge_type[len("rouge"):])
+                    reference_ngrams = prepared.ngrams.get(n) or _ngrams(prepared.tokens, n)
+                    candidate_ngrams = _ngrams(tokens, n)
+                    overlap = sum((reference_ngrams & candidate_ngrams).values())
+                    scores[rouge_type] = _fmeasure(overlap, sum(candidate_ngrams.values()), sum(reference_ngrams.values()))
+            results.append(scores)
+        return results
+
     def get_metrics_summary(self):
-        if not self.metrics_history:
+        # Averages of metrics that were never measured are None rather than a misleading 0.
+        history = self.metrics_history
+        if not len(history):
             return {}
-        df = pd.DataFrame(self.metrics_history)
         return {
-            "avg_rouge1": df["rouge1"].mean(),
-            "avg_rouge2": df["rouge2"].mean(),
-            "avg_rougeL": df["rougeL"].mean(),
-            "avg_bleu": df["bleu"].mean(),
-            "avg_response_time": df["response_time"].mean(),
-            "avg_cost": df["cost"].mean()
-        }
\ No newline at end of file
+            "avg_rouge1": history.mean("rouge1"),
+            "avg_rouge2": history.mean("rouge2"),
+            "avg_rougeL": history.mean("rougeL"),
+            "avg_bleu": history.mean("bleu"),
+            "avg_extraction": history.mean("extraction"),
+            "avg_response_time": history.mean("response_time"),
+            "avg_cost": history.mean("cost"),
+            "total_cost": history.total("cost"),
+            "total_prompt_tokens": history.total("prompt_tokens"),
+            "total_output_tokens": history.total("output_tokens")
+        }
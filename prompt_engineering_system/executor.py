@@ -0,0 +1,82 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+
+class CandidateTimeout(TimeoutError):
+    pass
+
+
+# Set by TaskScheduler.flow(); while a flow is active, calls go to its shared pool.
+active_flow: contextvars.ContextVar = contextvars.ContextVar("candidate_flow", default=None)
+
+
+class CandidateExecutor:
+    """Runs candidate calls on a bounded thread pool.
+
+    At most ``max_workers`` calls are in flight at once. A call that has been
+    running for longer than ``timeout`` seconds is reported as a
+    ``CandidateTimeout`` and its result is discarded when it eventually returns.
+    """
+
+    def __init__(self, max_workers: int = 4, timeout: Optional[float] = None, poll_interval: float = 0.05):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    def run(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> Iterator[Tuple[int, Any, Optional[BaseException]]]:
+        """Yield ``(index, result, error)`` for every item as its call finishes."""
+        items = list(items)
+        if not items:
+            return
+        flow = active_flow.get()
+        if flow is not None:
+            yield from flow.run(fn, items, self.timeout)
+            return
+
+        started = {}
+        lock = threading.Lock()
+
+        def call(index, item):
+            with lock:
+                started[index] = time.monotonic()
+            return fn(item)
+
+        pool = ThreadPoolExecutor(max_workers=min(self.max_workers, len(items)), thread_name_prefix="candidate")
+        try:
+            # Each call runs in a copy of the caller's context so tracing spans reach the request's trace.
+            pending = {pool.submit(contextvars.copy_context().run, call, i, item): i for i, item in enumerate(items)}
+            while pending:
+                done, _ = wait(pending, timeout=self._next_wait(pending, started, lock), return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    error = future.exception()
+                    yield index, (None if error else future.result()), error
+                if self.timeout is None:
+                    continue
+                now = time.monotonic()
+                with lock:
+                    expired = [f for f, i in pending.items() if i in started and now - started[i] >= self.timeout]
+                for future in expired:
+                    # A call that finished while the caller was busy is yielded by the next wait, not expired.
+                    if future.done():
+                        continue
+                    index = pending.pop(future)
+                    yield index, None, CandidateTimeout(f"Candidate {index} exceeded {self.timeout}s")
+        finally:
+            # Timed-out calls cannot be interrupted; let them finish in the background.
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _next_wait(self, pending, started, lock) -> Optional[float]:
+        if self.timeout is None:
+            return None
+        now = time.monotonic()
+        with lock:
+            remaining = [self.timeout - (now - started[i]) for i in pending.values() if i in started]
+        if not remaining:
+            return self.poll_interval
+        return max(0.0, min(min(remaining), self.poll_interval * 10))
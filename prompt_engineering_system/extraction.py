@@ -0,0 +1,131 @@
+import json
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence
+
+_TOKEN = re.compile(r"\w+")
+_FENCE = re.compile(r"^```\w*\s*|\s*```$", re.MULTILINE)
+_KEY_VALUE = re.compile(r"^\s*(?:[-*•]\s*)?\**\s*([^:=\n]{1,80}?)\s*\**\s*[:=]\s*(.*?)\s*$", re.MULTILINE)
+_EMPTY_VALUES = {"", "n/a", "na", "none", "null", "not found", "not available", "not specified", "unknown", "-"}
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def normalize_key(key: str) -> str:
+    return " ".join(tokenize(key.replace("_", " ")))
+
+
+def _value_text(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return ", ".join(_value_text(v) for v in value if v is not None)
+    if isinstance(value, dict):
+        return ", ".join(f"{k}: {_value_text(v)}" for k, v in value.items())
+    return "" if value is None else str(value)
+
+
+def parse_extraction(output: str) -> Optional[Dict[str, str]]:
+    """Read a model's extraction output as JSON, or failing that as ``key: value`` lines.
+
+    Keys are normalised with ``normalize_key``. Returns None when nothing
+    could be parsed.
+    """
+    text = _FENCE.sub("", output.strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            data = json.loads(text[start:end + 1])
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and data:
+            return {normalize_key(str(key)): _value_text(value).strip() for key, value in data.items()}
+    pairs = {normalize_key(key): value.strip().strip('",') for key, value in _KEY_VALUE.findall(text)}
+    pairs.pop("", None)
+    return pairs or None
+
+
+class SourceIndex:
+    """Token positions of a document, for checking that values occur in it.
+
+    A value matches when its tokens appear consecutively in the document;
+    the rarest of its tokens is used to find the candidate positions.
+    """
+
+    def __init__(self, text: str):
+        self.tokens = tokenize(text)
+        self.positions = defaultdict(list)
+        for position, token in enumerate(self.tokens):
+            self.positions[token].append(position)
+
+    def contains(self, value: str) -> bool:
+        tokens = tokenize(value)
+        if not tokens or any(token not in self.positions for token in tokens):
+            return False
+        anchor = min(range(len(tokens)), key=lambda i: len(self.positions[tokens[i]]))
+        for position in self.positions[tokens[anchor]]:
+            start = position - anchor
+            if start >= 0 and self.tokens[start:start + len(tokens)] == tokens:
+                return True
+        return False
+
+    def coverage(self, value: str) -> float:
+        tokens = tokenize(value)
+        if not tokens:
+            return 0.0
+        return sum(token in self.positions for token in tokens) / len(tokens)
+
+    def support(self, value: str) -> float:
+        """1.0 for a verbatim match, otherwise half the share of the value's tokens found in the text."""
+        return 1.0 if self.contains(value) else 0.5 * self.coverage(value)
+
+
+def _match_fields(parsed: Dict[str, str], fields: Sequence[str]) -> Dict[str, str]:
+    """Pair each requested field with at most one parsed key, and each key with at most one field.
+
+    Exact normalised keys are matched first; otherwise a key matches when
+    all the tokens of the shorter of the two names are among the other's.
+    """
+    matched = {}
+    unused = dict(parsed)
+    for field in fields:
+        key = normalize_key(field)
+        if key in unused:
+            matched[field] = unused.pop(key)
+    for field in fields:
+        if field in matched:
+            continue
+        wanted = set(tokenize(field.replace("_", " ")))
+        for name in list(unused):
+            have = set(name.split())
+            if wanted and have and (wanted <= have or have <= wanted):
+                matched[field] = unused.pop(name)
+                break
+    return matched
+
+
+def score_extraction(output: str, fields: Sequence[str], index: SourceIndex) -> dict:
+    """Score an extraction locally: the mean grounding of every requested field.
+
+    A field counts when the output has a value for it and that value occurs
+    in the source. ``valid`` is False when nothing could be parsed or no value
+    is supported by the text; ``reason`` then says why.
+    """
+    parsed = parse_extraction(output)
+    if not parsed:
+        return {"score": 0.0, "valid": False, "reason": "no fields could be parsed", "fields": {}}
+    values = {}
+    total = 0.0
+    matched = _match_fields(parsed, fields)
+    for field in fields:
+        value = matched.get(field)
+        if value is None or value.lower() in _EMPTY_VALUES:
+            continue
+        values[field] = value
+        total += index.support(value)
+    score = total / len(fields) if fields else 0.0
+    if not values:
+        return {"score": 0.0, "valid": False, "reason": "none of the requested fields were found", "fields": {}}
+    if score == 0:
+        return {"score": 0.0, "valid": False, "reason": "no extracted value occurs in the text", "fields": values}
+    return {"score": score, "valid": True, "reason": None, "fields": values}
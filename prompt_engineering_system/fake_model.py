@@ -0,0 +1,67 @@
+import hashlib
+import random
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+from .backends import ModelBackend
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel(ModelBackend):
+    """Deterministic offline stand-in for ``genai.GenerativeModel``.
+
+    The output is a repeatable sample of the prompt's own words, so different
+    system prompts get different ROUGE scores without any network access.
+    """
+
+    def __init__(self, latency: float = 0.0, model_name: str = "fake-model",
+                 responder: Optional[Callable[[str], str]] = None, output_words: int = 40,
+                 token_latency: float = 0.0, prompt_latency: float = 0.0):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.prompt_latency = prompt_latency
+        self.model_name = model_name
+        self.responder = responder
+        self.output_words = output_words
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        """Return a response, or with ``stream`` an iterator of word-sized chunks.
+
+        ``latency``, plus ``prompt_latency`` per 1000 prompt characters, is
+        paid before the first chunk and ``token_latency`` before every chunk
+        after it.
+        """
+        with self._lock:
+            self.calls += 1
+        delay = self.latency + self.prompt_latency * len(prompt) / 1000
+        if delay:
+            time.sleep(delay)
+        text = self.responder(prompt) if self.responder is not None else self._default_output(prompt)
+        if stream:
+            return self._stream(text)
+        if self.token_latency:
+            time.sleep(self.token_latency * max(len(text.split()) - 1, 0))
+        return FakeResponse(text)
+
+    def _stream(self, text: str) -> Iterator[FakeResponse]:
+        for i, word in enumerate(text.split(" ")):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            yield FakeResponse(word if i == 0 else " " + word)
+
+    def _default_output(self, prompt: str) -> str:
+        words = prompt.split()
+        if not words:
+            return ""
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16], 16)
+        rng = random.Random(seed)
+        count = min(self.output_words, len(words))
+        start = rng.randrange(0, len(words) - count + 1)
+        return " ".join(words[start:start + count])
@@ -1,23 +1,117 @@
 #main.py
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Iterable, Iterator, Optional, Sequence, Tuple
 from .prompt_generator import PromptGenerator
 from .evaluator import PromptEvaluator
 from .applications import SpecializedApplications
+from .scheduler import TaskScheduler
+from .tracing import Trace, activate
 
 class PromptEngineeringSystem:
-    def __init__(self):
+    def __init__(self, trace_sinks: Sequence = (), **application_options):
+        # Every finished request's trace is passed to each sink's emit().
+        self.trace_sinks = list(trace_sinks)
         self.prompt_generator = PromptGenerator()
         self.evaluator = PromptEvaluator()
-        self.applications = SpecializedApplications()
+        self.applications = SpecializedApplications(**application_options)
 
     def run_application(self, task_type, **kwargs):
+        # stream=True returns an iterator of progress events ending with a "done" event.
+        # The result carries a "timings" dict; profile="cprofile" or "pyinstrument" adds a profile to it.
+        trace = Trace(task_type, profile=kwargs.pop("profile", None))
+        context = activate(trace)
+        stream = kwargs.get("stream", False)
+        result = self._run_traced(trace, context, self._dispatch, task_type, kwargs)
+        if stream:
+            return self._traced_events(trace, context, result)
+        self._finish_trace(trace)
+        if isinstance(result, dict):
+            result["timings"] = trace.summary()
+        return result
+
+    def index_document(self, pdf_bytes: bytes, name: Optional[str] = None, profile: Optional[str] = None) -> dict:
+        """``SpecializedApplications.index_document`` under its own trace, with ``timings`` like run_application."""
+        trace = Trace("index_document", profile=profile)
+        context = activate(trace)
+        result = self._run_traced(trace, context, self.applications.index_document, pdf_bytes, name)
+        self._finish_trace(trace)
+        result["timings"] = trace.summary()
+        return result
+
+    def _run_traced(self, trace: Trace, context, fn, *args):
+        trace.start()
+        try:
+            return context.run(fn, *args)
+        except Exception as e:
+            trace.error = f"{type(e).__name__}: {e}"
+            self._finish_trace(trace)
+            raise
+
+    def run_many(self, requests: Iterable[dict], max_workers: int = 8,
+                 max_active: Optional[int] = None) -> Iterator[Tuple[int, Any, Optional[BaseException]]]:
+        """Run a batch of task requests on one shared scheduler, yielding ``(index, result, error)`` as each finishes.
+
+        Each request is a dict of run_application arguments with ``task_type``
+        and an optional ``priority`` (higher runs first); streaming is not
+        supported. Candidate calls from every request share ``max_workers``
+        threads, taken round-robin between requests of equal priority, and
+        identical prompts are sent to the model once.
+        """
+        requests = list(requests)
+        if not requests:
+            return
+
+        def run(request):
+            request = dict(request)
+            request.pop("stream", None)
+            task_type = request.pop("task_type")
+            with scheduler.flow(request.pop("priority", 0)):
+                return self.run_application(task_type, **request)
+
+        # Request threads mostly wait on the scheduler, so there can be more of them than workers.
+        max_active = max_active or max_workers * 4
+        with TaskScheduler(max_workers) as scheduler, \
+                ThreadPoolExecutor(max_workers=min(max_active, len(requests)), thread_name_prefix="request") as pool:
+            futures = {pool.submit(run, request): index for index, request in enumerate(requests)}
+            for future in as_completed(futures):
+                error = future.exception()
+                yield futures[future], (None if error else future.result()), error
+
+    def _traced_events(self, trace: Trace, context, events):
+        # Every step of the event generator runs inside the request's context.
+        try:
+            while True:
+                event = context.run(next, events, None)
+                if event is None:
+                    break
+                if event["event"] == "done":
+                    trace.finish()
+                    event["result"]["timings"] = trace.summary()
+                yield event
+        except Exception as e:
+            trace.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._finish_trace(trace)
+
+    def _finish_trace(self, trace: Trace):
+        trace.finish()
+        for sink in self.trace_sinks:
+            sink.emit(trace)
+
+    def _dispatch(self, task_type, kwargs: dict):
         reasoning_type = kwargs.pop("reasoning_type", "standard")
+        use_retrieval = kwargs.pop("use_retrieval", False)
+        retrieval = {"collection": kwargs["collection"]} if kwargs.get("collection") else {}
+        stream = kwargs.pop("stream", False)
         if task_type == "summarization":
-            return self.applications.summarize_text(kwargs["text"], reasoning_type=reasoning_type)
+            return self.applications.summarize_text(kwargs["text"], reasoning_type=reasoning_type, stream=stream,
+                                                    long_document=kwargs.get("long_document", False))
         elif task_type == "code_generation":
-            return self.applications.generate_code(kwargs["task_description"], kwargs["language"], reasoning_type=reasoning_type)
+            return self.applications.generate_code(kwargs["task_description"], kwargs["language"], reasoning_type=reasoning_type, stream=stream)
         elif task_type == "data_extraction":
-            return self.applications.extract_data(kwargs["text"], kwargs["fields"], reasoning_type=reasoning_type)
+            return self.applications.extract_data(kwargs["text"], kwargs["fields"], reasoning_type=reasoning_type, use_retrieval=use_retrieval, stream=stream, **retrieval)
         elif task_type == "question_answering":
-            return self.applications.answer_question(kwargs["context"], kwargs["question"], reasoning_type=reasoning_type)
+            return self.applications.answer_question(kwargs["context"], kwargs["question"], reasoning_type=reasoning_type, use_retrieval=use_retrieval, stream=stream, **retrieval)
         else:
-            raise ValueError(f"Unknown task_type: {task_type}")
\ No newline at end of file
+            raise ValueError(f"Unknown task_type: {task_type}")
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prompt_wins (
+    task_type TEXT NOT NULL,
+    language TEXT NOT NULL,
+    reasoning_type TEXT NOT NULL,
+    system_prompt TEXT NOT NULL,
+    wins INTEGER NOT NULL DEFAULT 0,
+    total_score REAL NOT NULL DEFAULT 0,
+    best_score REAL NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (task_type, language, reasoning_type, system_prompt)
+)
+"""
+
+
+class PromptMemory:
+    """SQLite record of which system prompt won for each task configuration.
+
+    A connection is opened per operation so one instance can be shared by
+    threads and processes writing to the same file.
+    """
+
+    def __init__(self, path: str = "prompt_memory.db"):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record(self, task_type: str, language: Optional[str], reasoning_type: Optional[str], system_prompt: str, score: float):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                INSERT INTO prompt_wins (task_type, language, reasoning_type, system_prompt, wins, total_score, best_score, updated_at)
+                VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+                ON CONFLICT (task_type, language, reasoning_type, system_prompt) DO UPDATE SET
+                    wins = wins + 1,
+                    total_score = total_score + excluded.total_score,
+                    best_score = MAX(best_score, excluded.best_score),
+                    updated_at = excluded.updated_at
+                """,
+                (task_type, language or "", reasoning_type or "standard", system_prompt, score, score, time.time()),
+            )
+
+    def winners(self, task_type: str, language: Optional[str], reasoning_type: Optional[str], limit: int = 1) -> List[str]:
+        """Historical winners for the configuration, most frequent first."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                SELECT system_prompt FROM prompt_wins
+                WHERE task_type = ? AND language = ? AND reasoning_type = ?
+                ORDER BY wins DESC, total_score / wins DESC, updated_at DESC
+                LIMIT ?
+                """,
+                (task_type, language or "", reasoning_type or "standard", limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM prompt_wins")
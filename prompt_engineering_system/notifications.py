@@ -0,0 +1,24 @@
+import logging
+import sys
+
+logger = logging.getLogger("prompt_engineering_system")
+
+_LOG_LEVELS = {
+    "error": logging.ERROR,
+    "warning": logging.WARNING,
+    "info": logging.INFO,
+    "success": logging.INFO,
+}
+
+
+def notify(level: str, message: str):
+    """Show a message in the Streamlit page when running under it, otherwise log it.
+
+    Streamlit is never imported from here: it is only used if the app has
+    already loaded it, so batch jobs and CLI tools do not pay for it.
+    """
+    st = sys.modules.get("streamlit")
+    if st is not None:
+        getattr(st, level)(message)
+    else:
+        logger.log(_LOG_LEVELS[level], message)
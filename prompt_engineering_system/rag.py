@@ -0,0 +1,142 @@
+import uuid
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Union
+
+from .tracing import span
+
+# numpy, pypdf, qdrant-client and sentence-transformers are imported where
+# they are used so that importing the package stays cheap.
+if TYPE_CHECKING:
+    import numpy as np
+    from qdrant_client import QdrantClient
+
+COLLECTION_NAME = "document_collection"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+VECTOR_SIZE = 384
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+EMBEDDING_BATCH_SIZE = 64
+UPLOAD_BATCH_SIZE = 256
+TOP_K = 4
+
+
+def iter_pdf_pages(source) -> Iterator[str]:
+    """Yield the text of one page at a time instead of the whole document.
+
+    ``source`` is a path or a binary file object.
+    """
+    from pypdf import PdfReader
+    reader = PdfReader(source)
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+
+def extract_text_from_pdf(source) -> str:
+    with span("pdf_extract"):
+        return "\n".join(iter_pdf_pages(source))
+
+
+def iter_chunks(pages: Iterable[str], chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> Iterator[str]:
+    """Split a stream of text into overlapping chunks of about ``chunk_size`` characters.
+
+    Chunks end on whitespace where possible, and only one chunk worth of
+    text is buffered at a time.
+    """
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+    buffer = ""
+    for page in pages:
+        buffer += page if not buffer else "\n" + page
+        while len(buffer) > chunk_size:
+            end = buffer.rfind(" ", chunk_size - overlap, chunk_size)
+            if end <= 0:
+                end = chunk_size
+            chunk = buffer[:end].strip()
+            if chunk:
+                yield chunk
+            start = max(end - overlap, 1)
+            # Start the next chunk on a word boundary.
+            space = buffer.find(" ", start, end)
+            buffer = buffer[space + 1 if space != -1 else start:]
+    tail = buffer.strip()
+    if tail:
+        yield tail
+
+
+def chunk_pages(pages: Iterable[str], chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Chunk every page on its own so an edit only changes the chunks of its page."""
+    with span("chunk"):
+        return [chunk for page in pages for chunk in iter_chunks([page], chunk_size, overlap)]
+
+
+def chunk_text(text: Union[str, Iterable[str]], chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    pages = [text] if isinstance(text, str) else text
+    with span("chunk"):
+        return list(iter_chunks(pages, chunk_size, overlap))
+
+
+@lru_cache(maxsize=None)
+def get_embedder(model_name: str = EMBEDDING_MODEL):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+def get_embeddings(chunks: List[str], batch_size: int = EMBEDDING_BATCH_SIZE, model_name: str = EMBEDDING_MODEL) -> "np.ndarray":
+    """Embed chunks in batches; rows are L2-normalised float32 vectors."""
+    import numpy as np
+    if not chunks:
+        return np.zeros((0, VECTOR_SIZE), dtype=np.float32)
+    with span("embed", chunks=len(chunks)):
+        embeddings = get_embedder(model_name).encode(
+            chunks, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+        )
+    return embeddings.astype(np.float32, copy=False)
+
+
+def collection_for(document_hash: str) -> str:
+    # One collection per document, so sessions sharing the client never see each other's chunks.
+    return f"{COLLECTION_NAME}_{document_hash[:32]}"
+
+
+@lru_cache(maxsize=None)
+def get_qdrant_client() -> "QdrantClient":
+    # In-process index shared by every SpecializedApplications in the process.
+    from qdrant_client import QdrantClient
+    return QdrantClient(location=":memory:")
+
+
+def setup_collection(client: "QdrantClient", collection_name: str = COLLECTION_NAME, vector_size: int = VECTOR_SIZE) -> bool:
+    from qdrant_client.models import Distance, VectorParams
+    with span("setup_collection"):
+        if client.collection_exists(collection_name):
+            client.delete_collection(collection_name)
+        client.create_collection(collection_name, vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE))
+    return True
+
+
+def upload_chunks(client: "QdrantClient", chunks: List[str], embeddings: "np.ndarray",
+                  collection_name: str = COLLECTION_NAME, batch_size: int = UPLOAD_BATCH_SIZE) -> bool:
+    from qdrant_client.models import PointStruct
+    if len(chunks) != len(embeddings):
+        raise ValueError("chunks and embeddings must have the same length")
+    with span("upload", chunks=len(chunks)):
+        for start in range(0, len(chunks), batch_size):
+            points = [
+                PointStruct(id=str(uuid.uuid4()), vector=vector.tolist(), payload={"text": chunk, "position": start + i})
+                for i, (chunk, vector) in enumerate(zip(chunks[start:start + batch_size], embeddings[start:start + batch_size]))
+            ]
+            client.upsert(collection_name, points=points)
+    return True
+
+
+def has_documents(client: "QdrantClient", collection_name: str = COLLECTION_NAME) -> bool:
+    return client.collection_exists(collection_name) and client.count(collection_name).count > 0
+
+
+def retrieve(client: "QdrantClient", query: str, top_k: int = TOP_K, collection_name: str = COLLECTION_NAME) -> List[str]:
+    """Return the ``top_k`` most similar chunks in document order."""
+    vector = get_embeddings([query])[0]
+    with span("search", top_k=top_k):
+        hits = client.query_points(collection_name, query=vector.tolist(), limit=top_k, with_payload=True).points
+    hits.sort(key=lambda hit: hit.payload.get("position", 0))
+    return [hit.payload["text"] for hit in hits]
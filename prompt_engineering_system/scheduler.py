@@ -0,0 +1,198 @@
+"""Shared worker pool for the candidate calls of many concurrent requests.
+
+Each request gets a ``Flow``; while it is active (see ``TaskScheduler.flow``)
+``CandidateExecutor.run`` hands its calls to the scheduler instead of
+starting a private pool. Queued calls are dispatched strictly by priority
+and round-robin between the flows of equal priority, so one request with
+fifty candidates cannot starve the others. Identical model calls made
+while the scheduler is open run once and share their result.
+"""
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, CancelledError, Future, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, Optional, Tuple
+
+from .executor import CandidateTimeout, active_flow
+
+
+class _Job:
+    __slots__ = ("fn", "item", "context", "future", "started")
+
+    def __init__(self, fn, item, context):
+        self.fn = fn
+        self.item = item
+        self.context = context
+        self.future = Future()
+        self.started = None
+
+
+class Flow:
+    """The queue of one request's calls inside a TaskScheduler."""
+
+    def __init__(self, scheduler: "TaskScheduler", priority: int):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.jobs = deque()
+
+    def run(self, fn: Callable[[Any], Any], items: Iterable[Any], timeout: Optional[float] = None
+            ) -> Iterator[Tuple[int, Any, Optional[BaseException]]]:
+        """Same contract as ``CandidateExecutor.run``, on the shared pool."""
+        jobs = [self.scheduler._enqueue(self, fn, item) for item in items]
+        pending = {job.future: index for index, job in enumerate(jobs)}
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=self._next_wait(pending, jobs, timeout), return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    error = CancelledError() if future.cancelled() else future.exception()
+                    yield index, (None if error else future.result()), error
+                if timeout is None:
+                    continue
+                now = time.monotonic()
+                for future, index in list(pending.items()):
+                    started = jobs[index].started
+                    if started is not None and now - started >= timeout and not future.done():
+                        del pending[future]
+                        yield index, None, CandidateTimeout(f"Candidate {index} exceeded {timeout}s")
+        finally:
+            # Calls that never started are dropped when the caller stops listening.
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def _next_wait(pending, jobs, timeout) -> Optional[float]:
+        if timeout is None:
+            return None
+        now = time.monotonic()
+        remaining = [timeout - (now - jobs[i].started) for i in pending.values() if jobs[i].started is not None]
+        return max(0.0, min(remaining)) if remaining else 0.05
+
+
+class TaskScheduler:
+    """A fixed pool of ``max_workers`` threads shared by every flow.
+
+    Higher ``priority`` flows are served first. Use as a context manager, or
+    call ``close`` to stop the workers.
+    """
+
+    def __init__(self, max_workers: int = 8, max_shared_results: int = 4096):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.max_shared_results = max_shared_results
+        self.deduplicated = 0
+        self._ready: Dict[int, deque] = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._flights: "OrderedDict[Hashable, Future]" = OrderedDict()
+        self._flights_lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"scheduler-{i}", daemon=True) for i in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            for flows in self._ready.values():
+                for flow in flows:
+                    for job in flow.jobs:
+                        job.future.cancel()
+                    flow.jobs.clear()
+            self._ready.clear()
+            self._condition.notify_all()
+
+    @contextmanager
+    def flow(self, priority: int = 0):
+        """Route the candidate calls made inside the block to this scheduler."""
+        token = active_flow.set(Flow(self, priority))
+        try:
+            yield
+        finally:
+            active_flow.reset(token)
+
+    def deduplicate(self, key: Hashable, call: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run ``call`` once per ``key``; concurrent and later callers get the same result.
+
+        Returns the result and whether it was shared rather than computed.
+        The last ``max_shared_results`` results are kept. Failed calls are
+        forgotten so that a retry can succeed.
+        """
+        with self._flights_lock:
+            future = self._flights.get(key)
+            owner = future is None
+            if owner:
+                future = self._flights[key] = Future()
+            else:
+                self.deduplicated += 1
+        if not owner:
+            return future.result(), True
+        try:
+            result = call()
+        except BaseException as e:
+            with self._flights_lock:
+                del self._flights[key]
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        with self._flights_lock:
+            while len(self._flights) > self.max_shared_results:
+                oldest = next(iter(self._flights.values()))
+                if not oldest.done():
+                    break
+                self._flights.popitem(last=False)
+        return result, False
+
+    def _enqueue(self, flow: Flow, fn, item) -> _Job:
+        job = _Job(fn, item, contextvars.copy_context())
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("TaskScheduler is closed")
+            if not flow.jobs:
+                self._ready.setdefault(flow.priority, deque()).append(flow)
+            flow.jobs.append(job)
+            self._condition.notify()
+        return job
+
+    def _next_job(self) -> Optional[_Job]:
+        with self._condition:
+            while True:
+                if self._closed:
+                    return None
+                for priority in sorted(self._ready, reverse=True):
+                    flows = self._ready[priority]
+                    if not flows:
+                        continue
+                    # Take one job from the flow at the head, then send it to the back of the line.
+                    flow = flows.popleft()
+                    job = flow.jobs.popleft()
+                    if flow.jobs:
+                        flows.append(flow)
+                    if job.future.set_running_or_notify_cancel():
+                        job.started = time.monotonic()
+                        return job
+                    break
+                else:
+                    self._condition.wait()
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                result = job.context.run(job.fn, job.item)
+            except BaseException as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
@@ -0,0 +1,127 @@
+import math
+from typing import Callable, Dict, List, Optional
+
+# An evaluator takes candidate indices, calls the model for each of them and
+# returns the score of every candidate that produced an output.
+Evaluate = Callable[[List[int]], Dict[int, float]]
+
+
+def interleave(groups: List[List[int]]) -> List[int]:
+    """Round-robin over groups so the first candidates cover every base prompt."""
+    order = []
+    depth = max((len(group) for group in groups), default=0)
+    for i in range(depth):
+        for group in groups:
+            if i < len(group):
+                order.append(group[i])
+    return order
+
+
+def limit_groups(groups: List[List[int]], limit: int) -> List[List[int]]:
+    """Keep the first ``limit`` candidates in interleaved order, preserving the grouping."""
+    kept = set(interleave(groups)[:limit])
+    limited = [[index for index in group if index in kept] for group in groups]
+    return [group for group in limited if group]
+
+
+class SearchStrategy:
+    name = "base"
+
+    def run(self, groups: List[List[int]], evaluate: Evaluate) -> None:
+        raise NotImplementedError
+
+
+class ExhaustiveSearch(SearchStrategy):
+    """Score every candidate, the original behaviour of optimize_prompt."""
+
+    name = "exhaustive"
+
+    def run(self, groups, evaluate):
+        evaluate(interleave(groups))
+
+
+class ThresholdSearch(SearchStrategy):
+    """Score candidates batch by batch and stop once one reaches ``threshold``."""
+
+    name = "threshold"
+
+    def __init__(self, threshold: float = 0.5, batch_size: int = 4):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.threshold = threshold
+        self.batch_size = batch_size
+
+    def run(self, groups, evaluate):
+        order = interleave(groups)
+        for start in range(0, len(order), self.batch_size):
+            scores = evaluate(order[start:start + self.batch_size])
+            if scores and max(scores.values()) >= self.threshold:
+                return
+
+
+class BudgetSearch(SearchStrategy):
+    """Score at most ``max_calls`` candidates, spread across base prompts."""
+
+    name = "budget"
+
+    def __init__(self, max_calls: int = 5):
+        if max_calls < 1:
+            raise ValueError("max_calls must be at least 1")
+        self.max_calls = max_calls
+
+    def run(self, groups, evaluate):
+        evaluate(interleave(groups)[:self.max_calls])
+
+
+class SuccessiveHalving(SearchStrategy):
+    """Successive halving over base prompts.
+
+    Each round scores one untried reasoning variant of every surviving base
+    prompt, then keeps the best ``1 / eta`` of them. Base prompts are ranked by
+    their best score so far. With a single variant per base prompt there is
+    nothing to halve and every candidate is scored once.
+    """
+
+    name = "successive_halving"
+
+    def __init__(self, eta: float = 2.0, max_calls: Optional[int] = None):
+        if eta <= 1:
+            raise ValueError("eta must be greater than 1")
+        self.eta = eta
+        self.max_calls = max_calls
+
+    def run(self, groups, evaluate):
+        arms = [list(group) for group in groups if group]
+        best = {arm: -math.inf for arm in range(len(arms))}
+        survivors = list(best)
+        calls = 0
+        while survivors:
+            batch = {}
+            for arm in survivors:
+                if arms[arm] and (self.max_calls is None or calls + len(batch) < self.max_calls):
+                    batch[arms[arm].pop(0)] = arm
+            if not batch:
+                return
+            scores = evaluate(list(batch))
+            calls += len(batch)
+            for index, arm in batch.items():
+                if index in scores:
+                    best[arm] = max(best[arm], scores[index])
+            if len(survivors) == 1:
+                continue
+            survivors.sort(key=lambda arm: best[arm], reverse=True)
+            survivors = survivors[:max(1, math.ceil(len(survivors) / self.eta))]
+
+
+STRATEGIES = {
+    ExhaustiveSearch.name: ExhaustiveSearch,
+    ThresholdSearch.name: ThresholdSearch,
+    BudgetSearch.name: BudgetSearch,
+    SuccessiveHalving.name: SuccessiveHalving,
+}
+
+
+def get_strategy(name: str, **kwargs) -> SearchStrategy:
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown search strategy: {name}")
+    return STRATEGIES[name](**kwargs)
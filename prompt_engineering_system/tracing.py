@@ -0,0 +1,190 @@
+"""Per-request tracing spans, timing sinks and opt-in profiling.
+
+A ``Trace`` is made active for one request through a context variable, so
+``span`` blocks anywhere in the call stack attach to the request that caused
+them. Outside a traced request ``span`` does nothing. Worker threads only see
+the trace if they run in a copy of the caller's context, which
+``CandidateExecutor`` and the search driver thread do.
+"""
+import contextvars
+import io
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("prompt_engineering_trace", default=None)
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+
+class Trace:
+    """Spans recorded for one request, with an optional profiler running alongside."""
+
+    def __init__(self, name: str, profile: Optional[str] = None, **attributes):
+        if profile is not None and profile not in PROFILERS:
+            raise ValueError(f"Unknown profiler: {profile}")
+        self.name = name
+        self.attributes = attributes
+        self.profile = profile
+        self.spans: List[dict] = []
+        self.error: Optional[str] = None
+        self.duration: Optional[float] = None
+        self.profile_output: Optional[str] = None
+        self._profiler = None
+        self._start = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._start = time.perf_counter()
+        # Both profilers only see the thread that starts them; candidate calls on worker threads show up as waits.
+        if self.profile == "cprofile":
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.profile == "pyinstrument":
+            from pyinstrument import Profiler
+            self._profiler = Profiler()
+            self._profiler.start()
+
+    def finish(self):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._start
+        if self._profiler is None:
+            return
+        if self.profile == "cprofile":
+            import pstats
+            self._profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(30)
+            self.profile_output = out.getvalue()
+        else:
+            self._profiler.stop()
+            self.profile_output = self._profiler.output_text()
+        self._profiler = None
+
+    def add(self, name: str, start: float, duration: float, attributes: dict):
+        record = {"name": name, "start": start - self._start, "duration": duration, "thread": threading.current_thread().name}
+        record.update(attributes)
+        with self._lock:
+            self.spans.append(record)
+
+    def stages(self) -> Dict[str, Dict[str, float]]:
+        """Count, total and maximum duration per span name."""
+        stages = defaultdict(lambda: {"count": 0, "total": 0.0, "max": 0.0})
+        with self._lock:
+            spans = list(self.spans)
+        for record in spans:
+            stage = stages[record["name"]]
+            stage["count"] += 1
+            stage["total"] += record["duration"]
+            stage["max"] = max(stage["max"], record["duration"])
+        return dict(stages)
+
+    def summary(self) -> dict:
+        with self._lock:
+            spans = list(self.spans)
+        summary = {"total": self.duration, "stages": self.stages(), "spans": spans}
+        if self.profile_output is not None:
+            summary["profile"] = self.profile_output
+        return summary
+
+
+class span:
+    """Time a block as a span of the active trace: ``with span("score", candidates=3): ...``."""
+
+    __slots__ = ("name", "attributes", "trace", "start")
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.trace = None
+
+    def __enter__(self):
+        self.trace = _current_trace.get()
+        if self.trace is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.trace is not None:
+            if exc_type is not None:
+                self.attributes["error"] = exc_type.__name__
+            self.trace.add(self.name, self.start, time.perf_counter() - self.start, self.attributes)
+        return False
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def activate(trace: Trace) -> contextvars.Context:
+    """Return a copy of the current context in which ``trace`` is active."""
+    context = contextvars.copy_context()
+    context.run(_current_trace.set, trace)
+    return context
+
+
+class JsonLinesSink:
+    """Appends one JSON line per finished request to ``path``."""
+
+    def __init__(self, path: str, include_spans: bool = True):
+        self.path = path
+        self.include_spans = include_spans
+        self._lock = threading.Lock()
+
+    def emit(self, trace: Trace):
+        summary = trace.summary()
+        if not self.include_spans:
+            summary.pop("spans")
+        summary.pop("profile", None)
+        record = {"request": trace.name, "time": time.time(), "error": trace.error, **trace.attributes, **summary}
+        line = json.dumps(record, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class PrometheusSink:
+    """Aggregates request and span timings and renders them in the Prometheus text format."""
+
+    def __init__(self, prefix: str = "prompt_engineering"):
+        self.prefix = prefix
+        self._requests = defaultdict(lambda: [0, 0.0, 0])
+        self._spans = defaultdict(lambda: [0, 0.0])
+        self._lock = threading.Lock()
+
+    def emit(self, trace: Trace):
+        stages = trace.stages()
+        with self._lock:
+            request = self._requests[trace.name]
+            request[0] += 1
+            request[1] += trace.duration or 0.0
+            request[2] += trace.error is not None
+            for name, stage in stages.items():
+                totals = self._spans[name]
+                totals[0] += stage["count"]
+                totals[1] += stage["total"]
+
+    def render(self) -> str:
+        p = self.prefix
+        lines = [f"# TYPE {p}_request_seconds summary"]
+        with self._lock:
+            requests = sorted(self._requests.items())
+            spans = sorted(self._spans.items())
+        for task, (count, total, _) in requests:
+            lines.append(f'{p}_request_seconds_sum{{task="{task}"}} {total:.6f}')
+            lines.append(f'{p}_request_seconds_count{{task="{task}"}} {count}')
+        lines.append(f"# TYPE {p}_request_errors_total counter")
+        for task, (_, _, errors) in requests:
+            lines.append(f'{p}_request_errors_total{{task="{task}"}} {errors}')
+        lines.append(f"# TYPE {p}_span_seconds summary")
+        for name, (count, total) in spans:
+            lines.append(f'{p}_span_seconds_sum{{span="{name}"}} {total:.6f}')
+            lines.append(f'{p}_span_seconds_count{{span="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.render())